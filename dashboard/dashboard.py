@@ -4,10 +4,10 @@ Main dashboard application for managing IoT network experiments and device scann
 """
 
 import streamlit as st
-import requests
 import pandas as pd
 from utils.auto_refresh import setup_auto_refresh
 from utils.icon_fix import apply_icon_fixes
+from utils.http_client import api_session
 
 # Page configuration
 st.set_page_config(
@@ -41,7 +41,7 @@ except ImportError:
 def fetch_devices_overview():
     """Fetch devices for overview statistics"""
     try:
-        resp = requests.get(API_URL, timeout=10)
+        resp = api_session.get(API_URL, timeout=10)
         if resp.status_code == 200:
             return resp.json()
         else:
@@ -54,7 +54,8 @@ def fetch_port_scan_summary():
     try:
         # Fetch scan results from the API
         scan_url = "http://localhost:8000/scan-results"
-        resp = requests.get(scan_url, timeout=10)
+        # Only port states are summarised here, so skip the raw nmap output
+        resp = api_session.get(scan_url, params={"include_raw": "false"}, timeout=10)
         if resp.status_code == 200:
             scan_results = resp.json()
             
@@ -4,7 +4,6 @@ Detailed view and management of individual IoT devices
 """
 
 import streamlit as st
-import requests
 import urllib.parse
 import pandas as pd
 import plotly.graph_objects as go
@@ -15,6 +14,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.icon_fix import apply_icon_fixes
+from utils.http_client import api_session
 
 # Import configuration
 try:
@@ -63,7 +63,7 @@ def fetch_device_by_mac(mac: str) -> Optional[Dict[str, Any]]:
     """
     try:
         url = f"{API_URL}/mac/{urllib.parse.quote(mac)}"
-        resp = requests.get(url, timeout=15)
+        resp = api_session.get(url, timeout=15)
         resp.raise_for_status()
         return resp.json()
     except Exception as e:
@@ -134,7 +134,7 @@ if device.get('ip_address') and device.get('status') == 'online':
                 scan_history_url = (
                     f"http://localhost:8000/scan-results/device/{device_id}/latest?scan_type=port_scan"
                 )
-                resp = requests.get(scan_history_url, timeout=10)
+                resp = api_session.get(scan_history_url, timeout=10)
                 if resp.status_code == 200:
                     result = resp.json()
                     # Validate returned data structure
@@ -608,7 +608,7 @@ with st.expander("⚡ Actions", expanded=True):
                             if scan_ports.strip():
                                 params["ports"] = scan_ports
 
-                            resp = requests.get(url, params=params, timeout=60)
+                            resp = api_session.get(url, params=params, timeout=60)
                             if resp.status_code == 200:
                                 scan_result = resp.json()
 
@@ -718,7 +718,7 @@ with st.expander("⚡ Actions", expanded=True):
                             if os_scan_ports.strip():
                                 params["ports"] = os_scan_ports
 
-                            resp = requests.get(url, params=params, timeout=60)
+                            resp = api_session.get(url, params=params, timeout=60)
                             if resp.status_code == 200:
                                 os_result = resp.json()
 
@@ -784,7 +784,7 @@ with st.expander("⚡ Actions", expanded=True):
                         # Add refresh button to check current status
                         if st.button(f"🔄 Refresh Status", key=f"refresh_exp_{exp['id']}"):
                             try:
-                                status_resp = requests.get(f"{EXPERIMENTS_URL}/{exp['id']}/status/v2", timeout=10)
+                                status_resp = api_session.get(f"{EXPERIMENTS_URL}/{exp['id']}/status/v2", timeout=10)
                                 if status_resp.status_code == 200:
                                     status_data = status_resp.json()
                                     st.success(f"✅ Status: {status_data.get('status', 'Unknown')}")
@@ -914,7 +914,7 @@ with st.expander("⚡ Actions", expanded=True):
                     
                     try:
                         # Use V2 API endpoint
-                        resp = requests.post(f"{EXPERIMENTS_URL}/v2", json=payload, timeout=30)
+                        resp = api_session.post(f"{EXPERIMENTS_URL}/v2", json=payload, timeout=30)
                         if resp.status_code == 200:
                             exp_data = resp.json()
                             exp_id = exp_data.get('id', None)
@@ -962,7 +962,7 @@ with st.expander("📦 PCAP Files", expanded=True):
         import urllib.parse
         try:
             url = f"{CAPTURES_URL}/device/{urllib.parse.quote(mac)}"
-            resp = requests.get(url, timeout=10)
+            resp = api_session.get(url, timeout=10)
             resp.raise_for_status()
             return resp.json()
         except Exception as e:
@@ -1064,7 +1064,7 @@ with st.expander("📦 PCAP Files", expanded=True):
                     """
                     url = f"{CAPTURES_URL}/{capture_id}/download"
                     try:
-                        resp = requests.get(url, timeout=30)
+                        resp = api_session.get(url, timeout=30)
                         if resp.status_code == 200:
                             return resp.content
                         else:
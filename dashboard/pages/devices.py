@@ -5,6 +5,7 @@ Manages and displays IoT devices discovered through network scanning
 
 import streamlit as st
 import requests
+from utils.http_client import api_session
 import pandas as pd
 from datetime import datetime
 from typing import List, Dict, Optional
@@ -25,7 +26,7 @@ def fetch_devices_from_db() -> List[Dict]:
     try:
         # Add trailing slash to avoid 307 redirect
         api_url = API_URL if API_URL.endswith('/') else f"{API_URL}/"
-        resp = requests.get(api_url, timeout=30)
+        resp = api_session.get(api_url, timeout=30)
         resp.raise_for_status()
         return resp.json()
     except requests.exceptions.HTTPError as e:
@@ -57,7 +58,7 @@ def fetch_devices_scan(subnet: str) -> List[Dict]:
         scan_url = f"{api_url}scan"
         payload = {"subnet": subnet}
         # Increase timeout to 5 minutes for network scanning
-        resp = requests.post(scan_url, json=payload, timeout=300)
+        resp = api_session.post(scan_url, json=payload, timeout=300)
         
         if resp.status_code == 200:
             return resp.json()
@@ -4,7 +4,6 @@ Manages and monitors IoT network attack experiments
 """
 
 import streamlit as st
-import requests
 import time
 import pandas as pd
 from datetime import datetime
@@ -13,6 +12,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.icon_fix import apply_icon_fixes
+from utils.http_client import api_session
 
 # Page configuration
 st.set_page_config(
@@ -161,7 +161,7 @@ def fetch_experiments() -> List[Dict]:
         List[Dict]: List of experiment data
     """
     try:
-        resp = requests.get(EXPERIMENTS_URL, timeout=10)
+        resp = api_session.get(EXPERIMENTS_URL, timeout=10)
         if resp.status_code == 200:
             return resp.json()
         else:
@@ -193,7 +193,7 @@ def stop_experiment(experiment_id: int) -> Tuple[bool, str]:
     """
     try:
         url = f"{EXPERIMENTS_URL}/{experiment_id}/stop"
-        resp = requests.post(url, timeout=10)
+        resp = api_session.post(url, timeout=10)
         if resp.status_code == 200:
             return True, "Experiment stopped successfully"
         else:
@@ -214,7 +214,7 @@ def fetch_experiment_pcaps(experiment_id: int) -> List[Dict]:
     try:
         # Use correct API endpoint to get PCAP files by experiment_id parameter
         url = f"{CAPTURES_URL}/?experiment_id={experiment_id}"
-        resp = requests.get(url, timeout=10)
+        resp = api_session.get(url, timeout=10)
         if resp.status_code == 200:
             return resp.json()
         else:
@@ -485,7 +485,7 @@ if experiments:
                         def get_pcap_file(capture_id):
                             url = f"{CAPTURES_URL}/{capture_id}/download"
                             try:
-                                resp = requests.get(url, timeout=30)
+                                resp = api_session.get(url, timeout=30)
                                 if resp.status_code == 200:
                                     return resp.content
                             except Exception:
@@ -0,0 +1,15 @@
+"""
+Shared HTTP session for backend API calls
+复用到FastAPI后端的TCP连接，避免每次请求重新建立连接
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Streamlit为每个浏览器会话使用独立线程，连接池需容纳并发请求
+POOL_SIZE = 16
+
+api_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+api_session.mount("http://", _adapter)
+api_session.mount("https://", _adapter)
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from db.base import SessionLocal
+from db.base import get_sessionmaker
 from db.models import Capture, Device, Experiment
 from .schemas import CaptureRead, CaptureDeleteResponse
 import os
@@ -9,7 +9,7 @@ import os
 router = APIRouter(prefix="/captures", tags=["captures"])
 
 def get_db():
-    db = SessionLocal()
+    db = get_sessionmaker()()
     try:
         yield db
     finally:
@@ -29,7 +29,7 @@ def list_captures(
         query = query.filter(Capture.created_at >= start_time)
     if end_time:
         query = query.filter(Capture.created_at <= end_time)
-    captures = query.order_by(Capture.created_at.desc()).all()
+    captures = query.order_by(Capture.created_at.desc(), Capture.id.desc()).all()
     
     # 手动构建返回字典，确保Pydantic可以正确序列化
     result = []
@@ -57,7 +57,7 @@ def get_device_captures(mac_address: str, db: Session = Depends(get_db)):
     experiment_ids = [e.id for e in experiments]
     if not experiment_ids:
         return []
-    captures = db.query(Capture).filter(Capture.experiment_id.in_(experiment_ids)).order_by(Capture.created_at.desc()).all()
+    captures = db.query(Capture).filter(Capture.experiment_id.in_(experiment_ids)).order_by(Capture.created_at.desc(), Capture.id.desc()).all()
     
     # 手动构建返回字典，确保Pydantic可以正确序列化
     result = []
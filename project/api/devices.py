@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any
-from db.base import SessionLocal
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from sqlalchemy.orm import Session, raiseload
+from typing import List, Dict, Any, Optional
+from db.base import bulk_insert, get_sessionmaker
 from db.models import Device
 from core.device_discovery import DeviceDiscovery
 import os
@@ -9,8 +9,12 @@ from core.scan_engine import ScanEngine, ScanType
 import ipaddress
 import asyncio
 import datetime
-from pydantic import BaseModel
-from .schemas import DeviceRead
+import logging
+from pydantic import BaseModel, validator
+from .schemas import DeviceRead, ScanResultCreate
+from .scan_results import update_or_create_scan_result
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/devices", tags=["devices"])
 
@@ -23,7 +27,7 @@ def get_db():
     Closes:
         The session after use.
     """
-    db = SessionLocal()
+    db = get_sessionmaker()()
     try:
         yield db
     finally:
@@ -31,13 +35,27 @@ def get_db():
 
 class ScanRequest(BaseModel):
     subnet: str
+    # True时只探测ARP缓存和数据库中已知在线的IP，而不是扫描整个网段
+    known_only: bool = False
+
+class BatchPortScanRequest(BaseModel):
+    ips: List[str]
+    save_to_db: bool = True
+    # 失败设备占比超过该值后不再启动新的扫描，其余设备直接返回跳过的错误结果
+    max_failure_ratio: Optional[float] = None
+
+    @validator('max_failure_ratio')
+    def validate_max_failure_ratio(cls, v):
+        if v is not None and not 0 <= v <= 1:
+            raise ValueError('max_failure_ratio must be between 0 and 1')
+        return v
 
 @router.post("/scan", response_model=List[Dict[str, str]])
 def scan_subnet(request: ScanRequest, db: Session = Depends(get_db)):
     """Scans a subnet for devices and returns device information (online and offline).
 
     Args:
-        request (ScanRequest): Request body containing subnet.
+        request (ScanRequest): Request body containing subnet and the optional known_only flag.
         db (Session): Database session.
 
     Returns:
@@ -47,20 +65,33 @@ def scan_subnet(request: ScanRequest, db: Session = Depends(get_db)):
         subnet = request.subnet
         devices_txt = os.path.join(os.path.dirname(__file__), "../data/devices.txt")
         discovery = DeviceDiscovery(devices_txt)
-        scanned = discovery.discover(subnet)
+        targets = None
+        if request.known_only:
+            network = ipaddress.ip_network(subnet, strict=False)
+            known_ips = set(DeviceDiscovery.read_arp_cache(subnet))
+            known_ips.update(
+                ip for (ip,) in db.query(Device.ip_address).filter(Device.status == 'online')
+                if ip and ipaddress.ip_address(ip) in network
+            )
+            # 没有任何已知IP时回退到全网段扫描
+            targets = sorted(known_ips) or None
+        scanned = discovery.discover(subnet, targets)
         identified_devices = discovery.identify(scanned)
 
         # 1. Ensure all known devices from devices.txt exist in DB
+        #    (one query for all devices; new ones are collected and bulk-inserted below)
         mac_to_device = {d.mac_address: d for d in db.query(Device).all()}
+        new_devices = {}
+        now = datetime.datetime.utcnow()
         for dev in discovery.mac_name_mapping.items():
             mac, name = dev
             # Ensure MAC is properly normalized
             normalized_mac = DeviceDiscovery.normalize_mac(mac)
             if normalized_mac not in mac_to_device:
-                db.add(Device(mac_address=normalized_mac, hostname=name, status='offline', ip_address=''))
+                new_devices[normalized_mac] = dict(ip_address='', mac_address=normalized_mac, hostname=name, status='offline', last_seen=now)
         
         # 2. Update DB: set all known devices offline by default
-        for device in db.query(Device).all():
+        for device in mac_to_device.values():
             device.status = 'offline'
             device.ip_address = ''
         
@@ -71,22 +102,23 @@ def scan_subnet(request: ScanRequest, db: Session = Depends(get_db)):
                 continue  # Only update online devices here
             # Ensure MAC is properly normalized for comparison
             normalized_mac = DeviceDiscovery.normalize_mac(device_info['MAC'])
-            device = db.query(Device).filter(Device.mac_address == normalized_mac).first()
+            device = mac_to_device.get(normalized_mac)
             if device:
                 device.ip_address = device_info['IP']
                 device.hostname = device_info['Name']
                 device.status = 'online'
-                device.last_seen = datetime.datetime.utcnow()
-                updated_count += 1
+                device.last_seen = now
             else:
-                db.add(Device(
+                new_devices[normalized_mac] = dict(
                     ip_address=device_info['IP'],
                     mac_address=normalized_mac,
                     hostname=device_info['Name'],
                     status='online',
-                    last_seen=datetime.datetime.utcnow()
-                ))
-                updated_count += 1
+                    last_seen=now
+                )
+            updated_count += 1
+        
+        bulk_insert(db, Device, list(new_devices.values()))
         
         # Commit all changes at once
         db.commit()
@@ -106,14 +138,30 @@ def scan_subnet(request: ScanRequest, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Scan failed: {str(e)}")
 
 @router.get("/", response_model=List[Dict[str, str]])
-def get_devices(db: Session = Depends(get_db)):
-    """Get all devices from database.
+def get_devices(
+    status: Optional[str] = Query(None, description="Filter by device status (online, offline)"),
+    exclude_hostname: Optional[str] = Query(None, description="Comma-separated hostnames to leave out, e.g. Unknown,Unknown Device"),
+    db: Session = Depends(get_db)
+):
+    """Get devices from database, optionally filtered by status and hostname.
+
+    Args:
+        status (Optional[str]): Only return devices with this status.
+        exclude_hostname (Optional[str]): Comma-separated hostnames to exclude.
+        db (Session): Database session.
 
     Returns:
         List[Dict[str, str]]: List of devices with MAC, Name, IP, Status.
     """
     try:
-        devices = db.query(Device).all()
+        query = db.query(Device).options(raiseload('*'))
+        # 过滤条件下推到SQL，只返回需要的设备
+        if status:
+            query = query.filter(Device.status == status)
+        if exclude_hostname:
+            hostnames = [h.strip() for h in exclude_hostname.split(',') if h.strip()]
+            query = query.filter(Device.hostname.notin_(hostnames))
+        devices = query.all()
         result = []
         for d in devices:
             result.append({
@@ -144,6 +192,29 @@ def get_device_by_mac(mac_address: str, db: Session = Depends(get_db)):
         "last_seen": device.last_seen
     }
 
+def _get_or_create_device_id(db: Session, ip: str) -> int:
+    """Return the id of the device with this IP, creating a temporary device if there is none.
+
+    Args:
+        db: Database session.
+        ip: Target IP address.
+
+    Returns:
+        int: The device id.
+    """
+    device = db.query(Device).filter(Device.ip_address == ip).first()
+    if not device:
+        device = Device(
+            ip_address=ip,
+            mac_address=f"temp_{ip.replace('.', '_')}",
+            hostname=f"External Device {ip}",
+            status="online"
+        )
+        db.add(device)
+        db.commit()
+        db.refresh(device)
+    return device.id
+
 @router.get("/{ip}/portscan")
 async def port_scan_device(ip: str, ports: str = None, fast_scan: bool = True, save_to_db: bool = True, db: Session = Depends(get_db)):
     """执行端口扫描
@@ -162,22 +233,8 @@ async def port_scan_device(ip: str, ports: str = None, fast_scan: bool = True, s
         # 验证IP地址格式
         ipaddress.ip_address(ip)
         
-        # 查找对应的设备
-        device = db.query(Device).filter(Device.ip_address == ip).first()
-        
-        # 如果设备不存在，创建一个临时设备记录
-        if not device:
-            device = Device(
-                ip_address=ip,
-                mac_address=f"temp_{ip.replace('.', '_')}",
-                hostname=f"External Device {ip}",
-                status="online"
-            )
-            db.add(device)
-            db.commit()
-            db.refresh(device)
-        
-        device_id = device.id if device else None
+        # 查找或创建设备记录（在线程中执行：提交可能等待SQLite写锁，不能阻塞事件循环）
+        device_id = await asyncio.to_thread(_get_or_create_device_id, db, ip)
         
         # 创建扫描引擎
         scan_engine = ScanEngine()
@@ -204,9 +261,6 @@ async def port_scan_device(ip: str, ports: str = None, fast_scan: bool = True, s
         # 保存到数据库
         if save_to_db and device_id:
             try:
-                from .scan_results import create_scan_result_internal, update_or_create_scan_result
-                from .schemas import ScanResultCreate
-                
                 scan_result_data = ScanResultCreate(
                     device_id=device_id,
                     scan_type="port_scan",
@@ -219,10 +273,11 @@ async def port_scan_device(ip: str, ports: str = None, fast_scan: bool = True, s
                 )
                 
                 # 使用更新或创建函数，确保一个设备只有一个扫描结果
-                update_or_create_scan_result(scan_result_data, db)
+                # （在线程中执行：提交可能等待SQLite写锁，不能阻塞事件循环）
+                await asyncio.to_thread(update_or_create_scan_result, scan_result_data, db)
             except Exception as e:
                 # 如果保存失败，记录错误但不影响扫描结果返回
-                print(f"Warning: Failed to save scan result to database: {e}")
+                logger.warning("Failed to save scan result for %s to database: %s", ip, e)
         
         return scan_result
         
@@ -231,6 +286,99 @@ async def port_scan_device(ip: str, ports: str = None, fast_scan: bool = True, s
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Port scan failed: {str(e)}")
 
+@router.post("/batch_portscan")
+async def batch_port_scan(request: BatchPortScanRequest, db: Session = Depends(get_db)):
+    """批量端口扫描：一次请求提交多个IP，由服务端并发执行nmap
+
+    Args:
+        request: 请求体，包含IP列表、是否保存到数据库和可选的失败比例上限
+        db: 数据库会话
+
+    Returns:
+        List[Dict]: 每个IP一条结果，顺序与请求中的IP一致（重复IP只扫描一次）
+    """
+    ips = list(dict.fromkeys(request.ips))
+    try:
+        for ip in ips:
+            ipaddress.ip_address(ip)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid IP address format")
+    if not ips:
+        return []
+
+    try:
+        # 一次查询取出所有已知设备，不存在的IP批量创建临时设备记录
+        ip_to_device_id = dict(
+            db.query(Device.ip_address, Device.id).filter(Device.ip_address.in_(ips))
+        )
+        missing = {f"temp_{ip.replace('.', '_')}": ip for ip in ips if ip not in ip_to_device_id}
+        if missing:
+            # 子网扫描会清空离线设备的IP，已有的临时设备按MAC找回并恢复IP
+            for device in db.query(Device).filter(Device.mac_address.in_(list(missing))):
+                device.ip_address = missing.pop(device.mac_address)
+                device.status = "online"
+            bulk_insert(db, Device, [
+                dict(
+                    ip_address=ip,
+                    mac_address=mac,
+                    hostname=f"External Device {ip}",
+                    status="online"
+                )
+                for mac, ip in missing.items()
+            ])
+            db.commit()
+            ip_to_device_id = dict(
+                db.query(Device.ip_address, Device.id).filter(Device.ip_address.in_(ips))
+            )
+
+        scan_engine = ScanEngine()
+        summary = await scan_engine.scan_multiple_devices(
+            [{'IP': ip, 'Name': f"Device {ip}"} for ip in ips],
+            ScanType.PORT_SCAN,
+            max_failure_ratio=request.max_failure_ratio
+        )
+
+        results = []
+        to_save = []
+        for ip, result in zip(ips, summary["results"]):
+            ports = result["tcp_ports"] + result["udp_ports"]
+            results.append({
+                "ip": ip,
+                "ports": ports,
+                "scan_duration": result["scan_duration"],
+                "total_tcp_ports": result["total_tcp_ports"],
+                "total_udp_ports": result["total_udp_ports"],
+                "error": result["error"]
+            })
+            if request.save_to_db and result["error"] is None:
+                to_save.append(ScanResultCreate(
+                    device_id=ip_to_device_id[ip],
+                    scan_type="port_scan",
+                    target_ip=ip,
+                    scan_duration=int(result["scan_duration"]),
+                    ports=ports,
+                    raw_output=result["raw_output"],
+                    command=result["command"],
+                    status="success"
+                ))
+
+        if to_save:
+            def save_all():
+                for scan_result_data in to_save:
+                    try:
+                        update_or_create_scan_result(scan_result_data, db)
+                    except Exception as e:
+                        logger.warning("Failed to save scan result for %s to database: %s", scan_result_data.target_ip, e)
+
+            # 提交可能等待SQLite写锁，放到线程中执行
+            await asyncio.to_thread(save_all)
+
+        return results
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch port scan failed: {str(e)}")
+
 @router.get("/{ip}/oscan")
 async def os_scan_device(ip: str, ports: str = "22,80,443", fast_scan: bool = True, save_to_db: bool = True, db: Session = Depends(get_db)):
     """执行OS指纹识别
@@ -249,22 +397,8 @@ async def os_scan_device(ip: str, ports: str = "22,80,443", fast_scan: bool = Tr
         # 验证IP地址格式
         ipaddress.ip_address(ip)
         
-        # 查找对应的设备
-        device = db.query(Device).filter(Device.ip_address == ip).first()
-        
-        # 如果设备不存在，创建一个临时设备记录
-        if not device:
-            device = Device(
-                ip_address=ip,
-                mac_address=f"temp_{ip.replace('.', '_')}",
-                hostname=f"External Device {ip}",
-                status="online"
-            )
-            db.add(device)
-            db.commit()
-            db.refresh(device)
-        
-        device_id = device.id if device else None
+        # 查找或创建设备记录（在线程中执行：提交可能等待SQLite写锁，不能阻塞事件循环）
+        device_id = await asyncio.to_thread(_get_or_create_device_id, db, ip)
         
         # 创建扫描引擎
         scan_engine = ScanEngine()
@@ -290,9 +424,6 @@ async def os_scan_device(ip: str, ports: str = "22,80,443", fast_scan: bool = Tr
         # 保存到数据库
         if save_to_db and device_id:
             try:
-                from .scan_results import create_scan_result_internal, update_or_create_scan_result
-                from .schemas import ScanResultCreate
-                
                 scan_result_data = ScanResultCreate(
                     device_id=device_id,
                     scan_type="os_scan",
@@ -306,10 +437,11 @@ async def os_scan_device(ip: str, ports: str = "22,80,443", fast_scan: bool = Tr
                 )
                 
                 # 使用更新或创建函数，确保一个设备只有一个扫描结果
-                update_or_create_scan_result(scan_result_data, db)
+                # （在线程中执行：提交可能等待SQLite写锁，不能阻塞事件循环）
+                await asyncio.to_thread(update_or_create_scan_result, scan_result_data, db)
             except Exception as e:
                 # 如果保存失败，记录错误但不影响扫描结果返回
-                print(f"Warning: Failed to save scan result to database: {e}")
+                logger.warning("Failed to save scan result for %s to database: %s", ip, e)
         
         return scan_result
         
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, raiseload
 from typing import List
 from datetime import datetime
-from db.base import SessionLocal
+from db.base import get_sessionmaker
 from db.models import Experiment, Capture
 from .schemas import ExperimentCreate, ExperimentRead, ExperimentCreateV2, ExperimentReadV2, ExperimentStatusV2
 from worker import run_attack_experiment, stop_attack_experiment, run_traffic_capture, run_cyclic_attack_experiment, celery
@@ -19,7 +19,7 @@ def get_db():
     Dependency that provides a SQLAlchemy database session.
     Closes the session after use.
     """
-    db = SessionLocal()
+    db = get_sessionmaker()()
     try:
         yield db
     finally:
@@ -197,7 +197,8 @@ def list_experiments(db: Session = Depends(get_db)):
     Returns:
         List[ExperimentRead]: List of all experiment objects.
     """
-    experiments = db.query(Experiment).all()
+    # 响应只包含列字段：raiseload阻止按需加载captures等关系
+    experiments = db.query(Experiment).options(raiseload('*')).all()
     result = []
     for exp in experiments:
         result.append({
@@ -230,7 +231,7 @@ def get_experiment(experiment_id: int, db: Session = Depends(get_db)):
     Raises:
         HTTPException: If the experiment is not found.
     """
-    exp = db.query(Experiment).filter(Experiment.id == experiment_id).first()
+    exp = db.query(Experiment).options(raiseload('*')).filter(Experiment.id == experiment_id).first()
     if not exp:
         raise HTTPException(status_code=404, detail="Experiment not found")
     
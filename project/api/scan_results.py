@@ -1,17 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, raiseload, undefer
 from typing import List, Optional
-from db.base import SessionLocal
+from db.base import get_sessionmaker
 from db.models import ScanResult, PortInfo, Device
 from .schemas import ScanResultCreate, ScanResultRead, PortInfoCreate, PortInfoRead
 import datetime
+import logging
 from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/scan-results", tags=["scan-results"])
 
+# SQLite在ON CONFLICT找不到对应唯一索引时的报错，只有这种情况才回退到先查后写
+MISSING_UNIQUE_INDEX_ERROR = "ON CONFLICT clause does not match any PRIMARY KEY or UNIQUE constraint"
+
+# 支持INSERT ... ON CONFLICT DO UPDATE的方言及其insert构造函数，其他数据库走先查后写
+UPSERT_INSERTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+
 def get_db():
     """Provides a SQLAlchemy database session."""
-    db = SessionLocal()
+    db = get_sessionmaker()()
     try:
         yield db
     finally:
@@ -49,11 +61,66 @@ def create_scan_result_internal(scan_result: ScanResultCreate, db: Session):
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to create scan result: {str(e)}")
 
+def build_scan_result_upsert(values: dict, dialect_name: str):
+    """Build the INSERT ... ON CONFLICT(device_id, scan_type) DO UPDATE for a dialect.
+
+    Returns:
+        The statement, or None if the dialect has no ON CONFLICT upsert.
+    """
+    insert = UPSERT_INSERTS.get(dialect_name)
+    if insert is None:
+        return None
+    stmt = insert(ScanResult).values(**values)
+    return stmt.on_conflict_do_update(
+        index_elements=[ScanResult.device_id, ScanResult.scan_type],
+        set_={key: stmt.excluded[key] for key in values if key not in ("device_id", "scan_type")}
+    )
+
 def update_or_create_scan_result(scan_result: ScanResultCreate, db: Session):
     """
     Update existing scan result for a device or create new one if none exists.
     This ensures one device has only one scan result per scan type.
+
+    Uses a single INSERT ... ON CONFLICT(device_id, scan_type) DO UPDATE against
+    the uq_scan_results_dev_type unique index on SQLite and PostgreSQL.
     """
+    values = {
+        "device_id": scan_result.device_id,
+        "scan_type": scan_result.scan_type,
+        "target_ip": scan_result.target_ip,
+        "scan_time": datetime.datetime.utcnow(),
+        "scan_duration": scan_result.scan_duration,
+        "ports": scan_result.ports,
+        "os_guesses": scan_result.os_guesses,
+        "os_details": scan_result.os_details,
+        "raw_output": scan_result.raw_output,
+        "command": scan_result.command,
+        "error": scan_result.error,
+        "status": scan_result.status,
+    }
+    stmt = build_scan_result_upsert(values, db.get_bind().dialect.name)
+    if stmt is None:
+        return _update_or_create_scan_result_legacy(scan_result, db)
+    try:
+        db.execute(stmt)
+        db.commit()
+    except OperationalError as e:
+        db.rollback()
+        if MISSING_UNIQUE_INDEX_ERROR not in str(e):
+            raise
+        # 旧数据库尚未建立唯一索引（运行 db/cleanup_duplicate_scans.py 迁移），回退到先查后写
+        return _update_or_create_scan_result_legacy(scan_result, db)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to update/create scan result: {str(e)}")
+
+    return db.query(ScanResult).filter(
+        ScanResult.device_id == scan_result.device_id,
+        ScanResult.scan_type == scan_result.scan_type
+    ).first()
+
+def _update_or_create_scan_result_legacy(scan_result: ScanResultCreate, db: Session):
+    """Query-then-write fallback for databases without the unique (device_id, scan_type) index."""
     try:
         # 查找该设备是否已有相同类型的扫描结果
         existing_result = db.query(ScanResult).filter(
@@ -87,8 +154,11 @@ def update_or_create_scan_result(scan_result: ScanResultCreate, db: Session):
 
 @router.post("/", response_model=ScanResultRead)
 def create_scan_result(scan_result: ScanResultCreate, db: Session = Depends(get_db)):
-    """Create a new scan result."""
-    return create_scan_result_internal(scan_result, db)
+    """Create a new scan result, replacing any existing result of the same device and scan type."""
+    device = db.query(Device).filter(Device.id == scan_result.device_id).first()
+    if not device:
+        raise HTTPException(status_code=404, detail="Device not found")
+    return update_or_create_scan_result(scan_result, db)
 
 @router.get("/", response_model=List[ScanResultRead])
 def get_scan_results(
@@ -97,11 +167,17 @@ def get_scan_results(
     target_ip: Optional[str] = Query(None, description="Filter by target IP"),
     limit: int = Query(100, description="Maximum number of results to return"),
     offset: int = Query(0, description="Number of results to skip"),
+    include_raw: bool = Query(True, description="Include the raw nmap output in each result"),
     db: Session = Depends(get_db)
 ):
     """Get scan results with optional filtering."""
     try:
-        query = db.query(ScanResult)
+        # 响应只包含列字段：raiseload阻止意外加载port_details等关系；
+        # raw_output是延迟加载的压缩列，需要时随主查询一起取出避免逐行补查，
+        # include_raw=false时完全不读取也不解压
+        query = db.query(ScanResult).options(raiseload('*'))
+        if include_raw:
+            query = query.options(undefer(ScanResult.raw_output))
         
         # 应用过滤器
         if device_id:
@@ -112,7 +188,7 @@ def get_scan_results(
             query = query.filter(ScanResult.target_ip == target_ip)
         
         # 按时间倒序排列
-        query = query.order_by(ScanResult.scan_time.desc())
+        query = query.order_by(ScanResult.scan_time.desc(), ScanResult.id.desc())
         
         # 应用分页
         results = query.offset(offset).limit(limit).all()
@@ -130,7 +206,7 @@ def get_scan_results(
                 "ports": result.ports,
                 "os_guesses": result.os_guesses,
                 "os_details": result.os_details,
-                "raw_output": result.raw_output,
+                "raw_output": result.raw_output if include_raw else None,
                 "command": result.command,
                 "error": result.error,
                 "status": result.status
@@ -138,16 +214,14 @@ def get_scan_results(
         
         return response_results
     except Exception as e:
-        import traceback
-        print(f"Error in get_scan_results: {e}")
-        print(traceback.format_exc())
+        logger.exception("Error in get_scan_results: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to get scan results: {str(e)}")
 
 @router.get("/{scan_result_id}", response_model=ScanResultRead)
 def get_scan_result(scan_result_id: int, db: Session = Depends(get_db)):
     """Get a specific scan result by ID."""
     try:
-        scan_result = db.query(ScanResult).filter(ScanResult.id == scan_result_id).first()
+        scan_result = db.query(ScanResult).options(raiseload('*'), undefer(ScanResult.raw_output)).filter(ScanResult.id == scan_result_id).first()
         if not scan_result:
             raise HTTPException(status_code=404, detail="Scan result not found")
         return scan_result
@@ -168,13 +242,13 @@ def get_device_scan_results(
         if not device:
             raise HTTPException(status_code=404, detail="Device not found")
         
-        query = db.query(ScanResult).filter(ScanResult.device_id == device_id)
+        query = db.query(ScanResult).options(raiseload('*'), undefer(ScanResult.raw_output)).filter(ScanResult.device_id == device_id)
         
         if scan_type:
             query = query.filter(ScanResult.scan_type == scan_type)
         
         # 按时间倒序排列
-        results = query.order_by(ScanResult.scan_time.desc()).limit(limit).all()
+        results = query.order_by(ScanResult.scan_time.desc(), ScanResult.id.desc()).limit(limit).all()
         
         return results
     except Exception as e:
@@ -184,14 +258,18 @@ def get_device_scan_results(
 def get_latest_scan_result(
     device_id: int,
     scan_type: str = Query(..., description="Scan type (port_scan, os_scan)"),
+    include_raw: bool = Query(True, description="Include the raw nmap output"),
     db: Session = Depends(get_db)
 ):
     """Get the latest scan result for a specific device and scan type."""
     try:
-        result = db.query(ScanResult).filter(
+        query = db.query(ScanResult).options(raiseload('*'))
+        if include_raw:
+            query = query.options(undefer(ScanResult.raw_output))
+        result = query.filter(
             ScanResult.device_id == device_id,
             ScanResult.scan_type == scan_type
-        ).order_by(ScanResult.scan_time.desc()).first()
+        ).order_by(ScanResult.scan_time.desc(), ScanResult.id.desc()).first()
         
         if not result:
             raise HTTPException(status_code=404, detail="No scan result found for this device and scan type")
@@ -206,7 +284,7 @@ def get_latest_scan_result(
             "ports": result.ports,
             "os_guesses": result.os_guesses,
             "os_details": result.os_details,
-            "raw_output": result.raw_output,
+            "raw_output": result.raw_output if include_raw else None,
             "command": result.command,
             "error": result.error,
             "status": result.status
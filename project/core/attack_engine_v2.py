@@ -17,25 +17,26 @@ import time
 from typing import Optional, Dict, Any, List
 from dataclasses import dataclass
 from enum import Enum
-import json
 import os
+import orjson
 from datetime import datetime
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S',
-    filename='logs/app.log',
-    filemode='a'
-)
-console = logging.StreamHandler(sys.stdout)
-console.setLevel(logging.INFO)
-formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s')
-console.setFormatter(formatter)
-logging.getLogger('').addHandler(console)
+if not logging.getLogger('').handlers:
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S',
+        filename='logs/app.log',
+        filemode='a'
+    )
+    console = logging.StreamHandler(sys.stdout)
+    console.setLevel(logging.INFO)
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    console.setFormatter(formatter)
+    logging.getLogger('').addHandler(console)
 
 class AttackType(Enum):
     """Attack type enumeration"""
@@ -50,7 +51,7 @@ class AttackMode(Enum):
     SINGLE = "single"          # Single attack
     CYCLIC = "cyclic"          # Cyclic attack
 
-@dataclass
+@dataclass(slots=True)
 class AttackConfig:
     """Attack configuration data class"""
     attack_type: AttackType
@@ -62,7 +63,7 @@ class AttackConfig:
     cycles: int = 1
     mode: AttackMode = AttackMode.SINGLE
 
-@dataclass
+@dataclass(slots=True)
 class AttackResult:
     """Attack result data class"""
     cycle: int
@@ -388,6 +389,15 @@ class CyclicAttackEngine:
         filename = f"attack_results_{config.attack_type.value}_{config.target_ip.replace('.', '_')}_{timestamp}.json"
         filepath = os.path.join(self.results_dir, filename)
         
+        # Tally the summary in a single pass over the cycle results
+        successful_cycles = 0
+        total_duration = 0
+        for r in self.attack_results:
+            if r.success:
+                successful_cycles += 1
+            total_duration += r.duration_sec
+        total_cycles = len(self.attack_results)
+        
         # Prepare data to save
         save_data = {
             'attack_config': {
@@ -401,17 +411,18 @@ class CyclicAttackEngine:
                 'mode': config.mode.value
             },
             'summary': {
-                'total_cycles': len(self.attack_results),
-                'successful_cycles': len([r for r in self.attack_results if r.success]),
-                'failed_cycles': len([r for r in self.attack_results if not r.success]),
-                'total_duration': sum(r.duration_sec for r in self.attack_results),
-                'average_duration': sum(r.duration_sec for r in self.attack_results) / len(self.attack_results) if self.attack_results else 0
+                'total_cycles': total_cycles,
+                'successful_cycles': successful_cycles,
+                'failed_cycles': total_cycles - successful_cycles,
+                'total_duration': total_duration,
+                'average_duration': total_duration / total_cycles if total_cycles else 0
             },
             'results': [
                 {
                     'cycle': r.cycle,
-                    'start_time': r.start_time.isoformat(),
-                    'end_time': r.end_time.isoformat(),
+                    # orjson writes datetimes in the same ISO 8601 form as isoformat()
+                    'start_time': r.start_time,
+                    'end_time': r.end_time,
                     'duration_sec': r.duration_sec,
                     'success': r.success,
                     'return_code': r.return_code,
@@ -422,8 +433,8 @@ class CyclicAttackEngine:
         }
         
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(save_data, f, indent=2, ensure_ascii=False)
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(save_data, option=orjson.OPT_INDENT_2))
             logger.info(f"Attack results saved to: {filepath}")
         except Exception as e:
             logger.error(f"Failed to save attack results: {e}")
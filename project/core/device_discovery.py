@@ -6,8 +6,16 @@ import subprocess
 import re
 import csv
 import os
+import ipaddress
 from typing import List, Dict, Optional
 
+# Compiled once: matches the MAC on nmap's "MAC Address: xx:xx:..." lines
+MAC_ADDRESS_RE = re.compile(r'([0-9A-Fa-f:]{17})')
+
+# Kernel ARP cache; entries with the ATF_COM flag have a resolved MAC
+ARP_CACHE_PATH = '/proc/net/arp'
+ARP_FLAG_COMPLETE = 0x2
+
 class DeviceDiscovery:
     def __init__(self, devices_txt: Optional[str] = None):
         """Initializes DeviceDiscovery with a device mapping file.
@@ -74,17 +82,46 @@ class DeviceDiscovery:
                     mapping[mac] = name
         return mapping
 
-    def discover(self, subnet: str) -> List[Dict]:
+    @staticmethod
+    def read_arp_cache(subnet: str, arp_path: str = ARP_CACHE_PATH) -> List[str]:
+        """Return the IPs in the subnet that have a resolved entry in the ARP cache.
+
+        Args:
+            subnet: Subnet to filter on (e.g., '10.12.0.0/24').
+            arp_path: Path to the kernel ARP table.
+        Returns:
+            List of IP address strings.
+        """
+        ips = []
+        if not os.path.exists(arp_path):
+            return ips
+        network = ipaddress.ip_network(subnet, strict=False)
+        with open(arp_path, 'r') as f:
+            next(f, None)  # header line
+            for line in f:
+                parts = line.split()
+                if len(parts) < 4:
+                    continue
+                ip, flags, mac = parts[0], parts[2], parts[3]
+                if not int(flags, 16) & ARP_FLAG_COMPLETE or mac == '00:00:00:00:00:00':
+                    continue
+                if ipaddress.ip_address(ip) in network:
+                    ips.append(ip)
+        return ips
+
+    def discover(self, subnet: str, targets: Optional[List[str]] = None) -> List[Dict]:
         """Scan the subnet and return a list of active hosts with IP and MAC.
 
         Args:
             subnet: Subnet to scan (e.g., '10.12.0.0/24').
+            targets: Optional list of IPs to probe instead of sweeping the whole subnet.
         Returns:
             List of dicts with 'IP' and 'MAC' keys.
         """
+        scan_targets = list(targets) if targets else [subnet]
         try:
             result = subprocess.run(
-                ['sudo', 'nmap', '-sn', '-PR', subnet], 
+                ['sudo', 'nmap', '-sn', '-PR', *scan_targets], 
                 capture_output=True, text=True, timeout=120
             )
         except subprocess.TimeoutExpired:
@@ -92,7 +129,7 @@ class DeviceDiscovery:
         except FileNotFoundError:
             try:
                 result = subprocess.run(
-                    ['nmap', '-sn', '-PR', subnet], 
+                    ['nmap', '-sn', '-PR', *scan_targets], 
                     capture_output=True, text=True, timeout=120
                 )
             except subprocess.TimeoutExpired:
@@ -112,7 +149,7 @@ class DeviceDiscovery:
                 current_ip = line.split()[-1]
                 current_mac = None
             elif 'MAC Address:' in line and current_ip:
-                match = re.search(r'([0-9A-Fa-f:]{17})', line)
+                match = MAC_ADDRESS_RE.search(line)
                 if match:
                     current_mac = match.group(1).lower()
         if current_ip:
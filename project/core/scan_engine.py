@@ -14,8 +14,10 @@ import logging
 import subprocess
 import csv
 import os
-import json
 import sys
+import time
+import orjson
+from operator import itemgetter
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 from enum import Enum
@@ -23,18 +25,26 @@ from enum import Enum
 logger = logging.getLogger(__name__)
 
 # Logging configuration
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S',
-    filename='logs/app.log',
-    filemode='a'
+if not logging.getLogger('').handlers:
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S',
+        filename='logs/app.log',
+        filemode='a'
+    )
+    console = logging.StreamHandler(sys.stdout)
+    console.setLevel(logging.INFO)
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    console.setFormatter(formatter)
+    logging.getLogger('').addHandler(console)
+
+# Upper bound on nmap processes scan_multiple_devices runs at the same time.
+# The scans mostly wait on the network, so the default scales with the CPU
+# count; SCAN_CONCURRENCY overrides it.
+DEFAULT_MAX_CONCURRENT_SCANS = int(
+    os.getenv("SCAN_CONCURRENCY", min(32, (os.cpu_count() or 1) * 4))
 )
-console = logging.StreamHandler(sys.stdout)
-console.setLevel(logging.INFO)
-formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s')
-console.setFormatter(formatter)
-logging.getLogger('').addHandler(console)
 
 
 class ScanType(Enum):
@@ -128,15 +138,20 @@ class ScanEngine:
             return online_devices
 
         try:
-            with open(self.devices_status_file, 'r') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row.get('Status') == 'online' and row.get('IP'):
-                        online_devices.append({
-                            'IP': row['IP'],
-                            'MAC': row['MAC'],
-                            'Name': row['Name']
-                        })
+            with open(self.devices_status_file, 'r', newline='') as f:
+                reader = csv.reader(f)
+                header = next(reader, None)
+                if header:
+                    # Resolve column positions once instead of building a dict per row
+                    columns = [header.index(name) for name in ('Status', 'IP', 'MAC', 'Name')]
+                    get_fields = itemgetter(*columns)
+                    min_width = max(columns) + 1
+                    for row in reader:
+                        if len(row) < min_width:
+                            continue
+                        status, ip, mac, name = get_fields(row)
+                        if status == 'online' and ip:
+                            online_devices.append({'IP': ip, 'MAC': mac, 'Name': name})
         except Exception as e:
             logger.error(f"Error reading device status file: {e}")
 
@@ -174,11 +189,11 @@ class ScanEngine:
             result.command = " ".join(command)
 
             # Execute the scan
-            start_time = datetime.now()
+            # result.scan_time already records the wall-clock start; the
+            # duration only needs the monotonic clock
+            start = time.monotonic()
             output = await self._run_command(command)
-            end_time = datetime.now()
-
-            result.scan_duration = (end_time - start_time).total_seconds()
+            result.scan_duration = time.monotonic() - start
             result.raw_output = output
 
             # Parse the scan result
@@ -194,8 +209,8 @@ class ScanEngine:
             result.error = str(e)
             logger.error(f"Error scanning device {target_ip}: {e}")
 
-        # Save the scan result
-        self._save_scan_result(result)
+        # Save the scan result (blocking file I/O, run off the event loop)
+        await asyncio.to_thread(self._save_scan_result, result)
 
         # Update last scan status
         self.last_scan_result = result
@@ -210,14 +225,25 @@ class ScanEngine:
         self,
         devices: List[Dict[str, str]],
         scan_type: ScanType = ScanType.PORT_SCAN,
-        delay_between_scans: float = 1.0
+        delay_between_scans: float = 0.0,
+        max_concurrent_scans: int = DEFAULT_MAX_CONCURRENT_SCANS,
+        max_failure_ratio: Optional[float] = None
     ) -> Dict[str, Any]:
         """Scans multiple devices in batch.
 
+        Up to ``max_concurrent_scans`` nmap processes run at the same time
+        (never more than there are devices); results are returned in the
+        same order as ``devices``.
+
         Args:
             devices: List of devices, each containing IP, MAC, and Name.
             scan_type: The type of scan.
-            delay_between_scans: Delay between scans in seconds.
+            delay_between_scans: Minimum interval in seconds between scan
+                starts in the same concurrency slot (0 disables pacing).
+            max_concurrent_scans: Maximum number of scans running at once.
+            max_failure_ratio: If set, stop starting new scans once more than
+                this fraction of the devices has failed; the remaining devices
+                get an error result instead of being scanned.
 
         Returns:
             Dict: A summary containing all scan results.
@@ -226,52 +252,75 @@ class ScanEngine:
             logger.warning("No devices to scan")
             return {"error": "No devices to scan"}
 
+        concurrency = max(1, min(len(devices), max_concurrent_scans))
         logger.info(
-            f"Starting batch scan of {len(devices)} devices - Scan type: {scan_type.value}"
+            f"Starting batch scan of {len(devices)} devices - Scan type: {scan_type.value} - "
+            f"Concurrency: {concurrency}"
         )
 
-        all_results = []
+        semaphore = asyncio.Semaphore(concurrency)
         total_start_time = datetime.now()
-
-        for i, device in enumerate(devices):
-            try:
-                logger.info(
-                    f"Scan progress: {i+1}/{len(devices)} - {device.get('IP', 'Unknown')}"
-                )
-
-                result = await self.scan_single_device(
-                    device['IP'],
-                    device.get('Name', 'Unknown'),
-                    scan_type
-                )
-                all_results.append(result)
-
-                # Delay between scans to avoid network congestion
-                if i < len(devices) - 1:
-                    await asyncio.sleep(delay_between_scans)
-
-            except Exception as e:
-                logger.error(
-                    f"Error scanning device {device.get('IP', 'Unknown')}: {e}"
-                )
-                error_result = ScanResult(
-                    device.get('IP', 'Unknown'),
-                    device.get('Name', 'Unknown'),
-                    scan_type
-                )
-                error_result.error = str(e)
-                all_results.append(error_result)
+        total_start = time.monotonic()
+        max_failures = None if max_failure_ratio is None else max_failure_ratio * len(devices)
+        failures = 0
+
+        async def scan_with_limit(i: int, device: Dict[str, str]) -> ScanResult:
+            nonlocal failures
+            async with semaphore:
+                if max_failures is not None and failures > max_failures:
+                    # Too many failures already: skip the scan instead of waiting on nmap
+                    result = ScanResult(
+                        device.get('IP', 'Unknown'),
+                        device.get('Name', 'Unknown'),
+                        scan_type
+                    )
+                    result.error = "Skipped: batch failure threshold exceeded"
+                    return result
+
+                slot_start = time.monotonic()
+                try:
+                    logger.info(
+                        f"Scan progress: {i+1}/{len(devices)} - {device.get('IP', 'Unknown')}"
+                    )
+                    result = await self.scan_single_device(
+                        device['IP'],
+                        device.get('Name', 'Unknown'),
+                        scan_type
+                    )
+                except Exception as e:
+                    logger.error(
+                        f"Error scanning device {device.get('IP', 'Unknown')}: {e}"
+                    )
+                    result = ScanResult(
+                        device.get('IP', 'Unknown'),
+                        device.get('Name', 'Unknown'),
+                        scan_type
+                    )
+                    result.error = str(e)
+
+                if result.error is not None:
+                    failures += 1
+
+                # Only pace when the scan finished faster than the minimum interval
+                remaining = delay_between_scans - (time.monotonic() - slot_start)
+                if remaining > 0 and i < len(devices) - 1:
+                    await asyncio.sleep(remaining)
+                return result
+
+        all_results = await asyncio.gather(
+            *(scan_with_limit(i, device) for i, device in enumerate(devices))
+        )
 
         total_end_time = datetime.now()
-        total_duration = (total_end_time - total_start_time).total_seconds()
+        total_duration = time.monotonic() - total_start
 
         # Generate summary
         summary = self._generate_scan_summary(
             all_results, total_start_time, total_end_time, total_duration
         )
 
-        # Save summary
-        self._save_scan_summary(summary)
+        # Save summary (serializing every result is CPU and file I/O, run off the event loop)
+        await asyncio.to_thread(self._save_scan_summary, summary)
 
         logger.info(
             f"Batch scan completed, scanned {len(all_results)} devices, "
@@ -282,20 +331,23 @@ class ScanEngine:
     async def scan_all_online_devices(
         self,
         scan_type: ScanType = ScanType.PORT_SCAN,
-        delay_between_scans: float = 1.0
+        delay_between_scans: float = 0.0,
+        max_concurrent_scans: int = DEFAULT_MAX_CONCURRENT_SCANS
     ) -> Dict[str, Any]:
         """Scans all online devices.
 
         Args:
             scan_type: The type of scan.
-            delay_between_scans: Delay between scans in seconds.
+            delay_between_scans: Minimum interval in seconds between scan
+                starts in the same concurrency slot (0 disables pacing).
+            max_concurrent_scans: Maximum number of scans running at once.
 
         Returns:
             Dict: Scan summary.
         """
         online_devices = self.get_online_devices()
         return await self.scan_multiple_devices(
-            online_devices, scan_type, delay_between_scans
+            online_devices, scan_type, delay_between_scans, max_concurrent_scans
         )
 
     def _build_scan_command(
@@ -487,20 +539,27 @@ class ScanEngine:
         Returns:
             Dict[str, Any]: The scan summary.
         """
-        successful_scans = [r for r in results if r.error is None]
-        failed_scans = [r for r in results if r.error is not None]
-
-        total_tcp_ports = sum(len(r.tcp_ports) for r in successful_scans)
-        total_udp_ports = sum(len(r.udp_ports) for r in successful_scans)
-
-        # Count OS info
-        os_detected = sum(1 for r in successful_scans if r.os_info)
-        os_guesses = sum(1 for r in successful_scans if r.os_info.get('aggressive_guesses'))
+        # Accumulate all counters in a single pass over the results
+        successful_scans = 0
+        total_tcp_ports = 0
+        total_udp_ports = 0
+        os_detected = 0
+        os_guesses = 0
+        for r in results:
+            if r.error is not None:
+                continue
+            successful_scans += 1
+            total_tcp_ports += len(r.tcp_ports)
+            total_udp_ports += len(r.udp_ports)
+            if r.os_info:
+                os_detected += 1
+                if r.os_info.get('aggressive_guesses'):
+                    os_guesses += 1
 
         return {
             "total_devices": len(results),
-            "successful_scans": len(successful_scans),
-            "failed_scans": len(failed_scans),
+            "successful_scans": successful_scans,
+            "failed_scans": len(results) - successful_scans,
             "total_scan_time": total_duration,
             "scan_start": start_time.isoformat(),
             "scan_end": end_time.isoformat(),
@@ -523,8 +582,8 @@ class ScanEngine:
         filepath = os.path.join(self.scan_results_dir, filename)
 
         try:
-            with open(filepath, 'w') as f:
-                json.dump(result.to_dict(), f, indent=2, ensure_ascii=False)
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(result.to_dict(), option=orjson.OPT_INDENT_2))
             logger.info(f"Scan result saved to: {filepath}")
         except Exception as e:
             logger.error(f"Error saving scan result: {e}")
@@ -532,6 +591,10 @@ class ScanEngine:
     def _save_scan_summary(self, summary: Dict[str, Any]):
         """Saves the scan summary to a JSON file.
 
+        The per-device results (which include the raw nmap output) are encoded
+        and written one at a time, one result per line, so the whole file is
+        never held in memory as a single buffer.
+
         Args:
             summary: The scan summary dictionary.
         """
@@ -539,9 +602,17 @@ class ScanEngine:
         filename = f"scan_summary_{timestamp}.json"
         filepath = os.path.join(self.scan_results_dir, filename)
 
+        header = {k: v for k, v in summary.items() if k != "results"}
         try:
-            with open(filepath, 'w') as f:
-                json.dump(summary, f, indent=2, ensure_ascii=False)
+            with open(filepath, 'wb') as f:
+                # Header fields without the closing brace, then the results array
+                f.write(orjson.dumps(header)[:-1])
+                f.write(b',"results":[\n' if header else b'"results":[\n')
+                for i, item in enumerate(summary.get("results", [])):
+                    if i:
+                        f.write(b',\n')
+                    f.write(orjson.dumps(item))
+                f.write(b'\n]}\n')
             logger.info(f"Scan summary saved to: {filepath}")
         except Exception as e:
             logger.error(f"Error saving scan summary: {e}")
@@ -593,12 +664,12 @@ if __name__ == "__main__":
 
             # Perform port scan on all online devices
             print(f"\nPerforming port scan on all online devices...")
-            port_summary = await engine.scan_all_online_devices(ScanType.PORT_SCAN, delay_between_scans=1.0)
+            port_summary = await engine.scan_all_online_devices(ScanType.PORT_SCAN)
             print(f"Port scan summary: {port_summary}")
 
             # Perform OS scan on all online devices
             print(f"\nPerforming OS scan on all online devices...")
-            os_summary = await engine.scan_all_online_devices(ScanType.OS_SCAN, delay_between_scans=1.0)
+            os_summary = await engine.scan_all_online_devices(ScanType.OS_SCAN)
             print(f"OS scan summary: {os_summary}")
         else:
             print("No online devices found")
@@ -16,13 +16,26 @@ Example usage:
 
 import subprocess
 import os
+import shutil
 import signal
+import threading
 import time
+from collections import deque
 
 
 class TcpdumpUtil:
     """Utility class to manage tcpdump process for packet capture."""
 
+    # Maximum number of stderr lines kept for diagnostics
+    STDERR_TAIL_LINES = 50
+
+    # Maximum time to wait for tcpdump to create the output file on start
+    STARTUP_TIMEOUT_SEC = 2.0
+
+    # Preflight results cached across instances (resolved lazily)
+    _tcpdump_path = None
+    _known_interfaces = None
+
     def __init__(self, output_file='capture.pcap', interface='any', extra_args=None, target_ip=None):
         """Initialize TcpdumpUtil.
         
@@ -37,6 +50,69 @@ class TcpdumpUtil:
         self.extra_args = extra_args or []
         self.target_ip = target_ip
         self.process = None
+        self._stderr_tail = deque(maxlen=self.STDERR_TAIL_LINES)
+        self._drain_thread = None
+
+    @classmethod
+    def _resolve_tcpdump(cls):
+        """Locate the tcpdump binary once and cache the result.
+
+        Returns:
+            str: Absolute path to tcpdump.
+
+        Raises:
+            RuntimeError: If tcpdump is not installed.
+        """
+        if cls._tcpdump_path is None:
+            path = shutil.which('tcpdump')
+            if not path:
+                raise RuntimeError("tcpdump命令不可用")
+            cls._tcpdump_path = path
+            print(f"tcpdump路径: {path}")
+        return cls._tcpdump_path
+
+    @classmethod
+    def _interface_exists(cls, interface):
+        """Check whether a network interface exists using /sys/class/net.
+
+        The interface list is cached and only re-read when a lookup misses,
+        so interfaces created after the first check are still found.
+
+        Args:
+            interface (str): Interface name ('any' is always accepted).
+
+        Returns:
+            bool: True if the interface exists.
+        """
+        if interface == 'any':
+            return True
+        if cls._known_interfaces is None or interface not in cls._known_interfaces:
+            try:
+                cls._known_interfaces = set(os.listdir('/sys/class/net'))
+            except OSError:
+                # Without sysfs we cannot verify; let tcpdump report the error
+                return True
+        return interface in cls._known_interfaces
+
+    def _drain_stderr(self, stream):
+        """Continuously read tcpdump stderr so the pipe never fills up.
+
+        Only the last STDERR_TAIL_LINES lines are kept for diagnostics.
+
+        Args:
+            stream: Binary stderr pipe of the tcpdump process.
+        """
+        try:
+            for line in iter(stream.readline, b''):
+                self._stderr_tail.append(line)
+        except (OSError, ValueError):
+            pass
+        finally:
+            stream.close()
+
+    def _stderr_text(self):
+        """Return the buffered stderr tail decoded as text."""
+        return b''.join(self._stderr_tail).decode('utf-8', errors='replace')
 
     def start(self):
         """Start the tcpdump process with bidirectional capture."""
@@ -45,7 +121,7 @@ class TcpdumpUtil:
         
         # Build command with options for bidirectional capture
         cmd = [
-            'tcpdump',  # In Docker we don't need sudo
+            self._resolve_tcpdump(),  # In Docker we don't need sudo
             '-i', self.interface,
             '-w', self.output_file,
             '-s', '0',  # Capture full packet size
@@ -72,55 +148,41 @@ class TcpdumpUtil:
         # 确保输出目录存在
         os.makedirs(os.path.dirname(self.output_file), exist_ok=True)
         
-        # 检查tcpdump命令是否可用
-        try:
-            result = subprocess.run(['which', 'tcpdump'], check=True, capture_output=True, text=True)
-            print(f"tcpdump路径: {result.stdout.strip()}")
-        except subprocess.CalledProcessError:
-            raise RuntimeError("tcpdump命令不可用")
-        
-        # 检查网络接口
-        try:
-            # 列出所有网络接口
-            result = subprocess.run(['ip', 'link', 'show'], check=True, capture_output=True, text=True)
-            print(f"可用网络接口:\n{result.stdout}")
-            
-            # 获取指定接口的IP地址
-            result = subprocess.run(['ip', 'addr', 'show', self.interface], check=True, capture_output=True, text=True)
-            print(f"{self.interface}接口信息:\n{result.stdout}")
-        except subprocess.CalledProcessError as e:
-            raise RuntimeError(f"网络接口检查失败: {e}")
-        
-        # 测试tcpdump是否可以在指定接口上工作
-        try:
-            test_cmd = ['tcpdump', '-i', self.interface, '-c', '1', '-n']
-            print(f"测试tcpdump命令: {' '.join(test_cmd)}")
-            result = subprocess.run(test_cmd, capture_output=True, text=True, timeout=3)
-            print(f"tcpdump测试结果:\n{result.stdout}\n{result.stderr}")
-        except subprocess.TimeoutExpired:
-            print("tcpdump测试超时，但这是正常的")
-        except Exception as e:
-            raise RuntimeError(f"tcpdump测试失败: {e}")
+        # 检查网络接口（tcpdump路径已在构建命令时解析并缓存）
+        if not self._interface_exists(self.interface):
+            raise RuntimeError(f"网络接口检查失败: 接口 {self.interface} 不存在")
         
         # 启动tcpdump进程
         try:
+            # tcpdump写入-w文件，stdout无用；stderr使用二进制管道并由后台线程排空
             self.process = subprocess.Popen(
                 cmd,
-                stdout=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
                 stderr=subprocess.PIPE,
-                preexec_fn=os.setsid,
-                text=True  # 使用文本模式
+                start_new_session=True
             )
+            self._stderr_tail.clear()
+            self._drain_thread = threading.Thread(
+                target=self._drain_stderr, args=(self.process.stderr,), daemon=True
+            )
+            self._drain_thread.start()
             print(f"tcpdump进程已启动 (PID: {self.process.pid})")
         except Exception as e:
             raise RuntimeError(f"启动tcpdump进程失败: {e}")
         
-        # 等待一下确保进程启动
-        time.sleep(1)
+        # 轮询等待输出文件出现，而不是固定等待1秒
+        # tcpdump只有在抓包设备打开成功后才会创建-w文件（pcap头可能仍在缓冲区中）
+        deadline = time.monotonic() + self.STARTUP_TIMEOUT_SEC
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None or os.path.exists(self.output_file):
+                break
+            time.sleep(0.01)
         
         # 检查进程是否正常启动
         if self.process.poll() is not None:
-            stderr_output = self.process.stderr.read() if self.process.stderr else "无错误输出"
+            self._drain_thread.join(timeout=1)
+            stderr_output = self._stderr_text() or "无错误输出"
+            self.process = None
             raise RuntimeError(f"tcpdump进程启动失败: {stderr_output}")
         
         # 检查输出文件是否创建
@@ -129,6 +191,15 @@ class TcpdumpUtil:
         
         print(f"tcpdump已成功启动，输出文件: {self.output_file}")
 
+    def _report_stderr(self):
+        """Wait for the stderr drain thread and print the buffered tail."""
+        if self._drain_thread is not None:
+            self._drain_thread.join(timeout=1)
+            self._drain_thread = None
+        stderr = self._stderr_text()
+        if stderr:
+            print(f"进程错误:\n{stderr}")
+
     def stop(self):
         """Stop the tcpdump process."""
         if self.process is None:
@@ -140,12 +211,7 @@ class TcpdumpUtil:
             # 检查进程是否还在运行
             if self.process.poll() is not None:
                 print(f"tcpdump进程已经停止，返回码: {self.process.returncode}")
-                stdout = self.process.stdout.read() if self.process.stdout else ""
-                stderr = self.process.stderr.read() if self.process.stderr else ""
-                if stdout:
-                    print(f"进程输出:\n{stdout}")
-                if stderr:
-                    print(f"进程错误:\n{stderr}")
+                self._report_stderr()
                 return
             
             # 先尝试优雅停止
@@ -167,13 +233,8 @@ class TcpdumpUtil:
                 self.process.wait()
                 print(f"进程已被强制终止，返回码: {self.process.returncode}")
             
-            # 读取进程输出
-            stdout = self.process.stdout.read() if self.process.stdout else ""
-            stderr = self.process.stderr.read() if self.process.stderr else ""
-            if stdout:
-                print(f"进程输出:\n{stdout}")
-            if stderr:
-                print(f"进程错误:\n{stderr}")
+            # 输出最后的stderr内容
+            self._report_stderr()
             
             # 检查输出文件
             if os.path.exists(self.output_file):
@@ -1,15 +1,136 @@
 import os
-from sqlalchemy import create_engine
+import fcntl
+from functools import lru_cache
+from sqlalchemy import create_engine, event, insert, inspect
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool
 
-# Ensure the data directory exists
 data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../data'))
-os.makedirs(data_dir, exist_ok=True)
 
 SQLALCHEMY_DATABASE_URL = f"sqlite:///{os.path.join(data_dir, 'iotlab.db')}"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+# Held while creating tables so only one process at a time runs the DDL
+SCHEMA_LOCK_PATH = os.path.join(data_dir, '.schema.lock')
+
+# SQLite PRAGMAs applied to every new connection:
+# - WAL lets readers (API) proceed while a writer (worker) commits
+# - synchronous=NORMAL skips the per-commit fsync of the WAL (safe in WAL mode)
+# - 64 MiB page cache, 256 MiB mmap and in-memory temp tables
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
\ No newline at end of file
+
+# Rows per executemany() call in bulk_insert()
+BULK_INSERT_CHUNK_SIZE = 10_000
+
+Base = declarative_base()
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply SQLITE_PRAGMAS when the pool opens a new DBAPI connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+@lru_cache(maxsize=1)
+def get_engine():
+    """Create the SQLAlchemy engine on first use and return the same instance afterwards.
+
+    Returns:
+        Engine: The process-wide SQLAlchemy engine.
+    """
+    # Ensure the data directory exists
+    os.makedirs(data_dir, exist_ok=True)
+
+    # Keep a small pool of reusable connections instead of reconnecting per
+    # session (SQLAlchemy 1.4 defaults to NullPool for file-based SQLite).
+    # timeout is SQLite's busy timeout: writers wait for the lock instead of failing.
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False, "timeout": 30},
+        poolclass=QueuePool,
+        pool_size=5,
+        max_overflow=10,
+        pool_pre_ping=True,
+    )
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+@lru_cache(maxsize=1)
+def get_sessionmaker():
+    """Return the session factory bound to get_engine().
+
+    Returns:
+        sessionmaker: The process-wide session factory.
+    """
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+
+
+def ensure_schema():
+    """Create any missing tables, once per database rather than once per process.
+
+    Every API worker calls this at import. The file lock serializes them, and a
+    single sqlite_master lookup lets warm starts skip create_all() (and its
+    per-table existence checks) when all tables are already there.
+
+    Databases created before ScanResult.target_ip became an integer column are
+    migrated here too, so an upgraded deployment never serves text rows.
+    """
+    from . import models  # noqa: F401 - registers the tables on Base.metadata
+    from .cleanup_duplicate_scans import migrate_target_ip_to_integer
+
+    engine = get_engine()
+    with open(SCHEMA_LOCK_PATH, 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            with engine.connect() as conn:
+                existing_tables = set(inspect(conn).get_table_names())
+            if not existing_tables.issuperset(Base.metadata.tables):
+                Base.metadata.create_all(bind=engine)
+            migrate_target_ip_to_integer(engine)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def bulk_insert(db, model, rows, chunk_size=BULK_INSERT_CHUNK_SIZE):
+    """Insert many rows with one Core INSERT per chunk instead of one ORM add() per row.
+
+    Column defaults still apply, but no ORM objects are created, so the inserted
+    rows are not in the session's identity map; query them again if needed.
+    The caller commits.
+
+    Args:
+        db: SQLAlchemy session.
+        model: Mapped class whose table receives the rows.
+        rows: List of column-name -> value dicts.
+        chunk_size: Maximum rows passed to a single executemany().
+
+    Returns:
+        int: Number of rows inserted.
+    """
+    statement = insert(model)
+    for start in range(0, len(rows), chunk_size):
+        db.execute(statement, rows[start:start + chunk_size])
+    return len(rows)
+
+
+def __getattr__(name):
+    """Resolve ``engine`` and ``SessionLocal`` lazily on first access.
+
+    Keeps ``from db.base import engine, SessionLocal`` working while
+    deferring engine creation until something actually needs the database.
+    """
+    if name == "engine":
+        return get_engine()
+    if name == "SessionLocal":
+        return get_sessionmaker()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,202 +2,499 @@
 """
 清理重复扫描结果脚本
 确保每个设备每种扫描类型只有一个最新的扫描结果
+
+新建的数据库由唯一索引 uq_scan_results_dev_type 在写入时防止重复；
+对旧数据库，本脚本在去重后补建该唯一索引（一次性迁移），
+并把文本存储的target_ip迁移为整数列。
 """
 
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from db.base import engine, SessionLocal
-from db.models import ScanResult, Device
-from sqlalchemy import text
-import datetime
+# 引擎和ORM模型在函数内按需导入/创建，--help 等不访问数据库的调用无需初始化它们
+from db.base import get_engine
+from sqlalchemy import Integer, bindparam, text
+import argparse
+import logging
 
-def cleanup_duplicate_scan_results():
-    """清理重复的扫描结果"""
-    db = SessionLocal()
-    try:
-        print("🔍 开始清理重复的扫描结果...")
-        
-        # 1. 统计清理前的数据
-        total_before = db.query(ScanResult).count()
-        print(f"   清理前总扫描结果数: {total_before}")
-        
-        # 2. 查找重复记录
-        duplicates_query = text("""
-            WITH ranked_results AS (
-                SELECT 
-                    id,
-                    device_id,
-                    scan_type,
-                    target_ip,
-                    scan_time,
-                    ROW_NUMBER() OVER (
-                        PARTITION BY device_id, scan_type 
-                        ORDER BY scan_time DESC
-                    ) as rn
-                FROM scan_results
-            )
-            SELECT 
-                device_id,
-                scan_type,
-                COUNT(*) as total_count,
-                COUNT(CASE WHEN rn > 1 THEN 1 END) as duplicate_count
-            FROM ranked_results 
+logger = logging.getLogger(__name__)
+
+# 每批删除的记录数
+DEFAULT_BATCH_SIZE = 5000
+
+# --swap 时，重复记录占比超过该阈值才改用"复制保留行-清空-写回"
+SWAP_THRESHOLD = 0.3
+
+# 收集待删除id（每个device_id+scan_type只保留scan_time最新、相同时id最大的一行）的SQL，
+# 按数据库方言选择各自规划器最擅长的写法
+DUPLICATE_IDS_SQL = {
+    # SQLite：相关子查询反连接，可直接走 (device_id, scan_type, scan_time) 复合索引
+    "sqlite": """
+        SELECT id FROM scan_results
+        WHERE EXISTS (
+            SELECT 1 FROM scan_results newer
+            WHERE newer.device_id IS scan_results.device_id
+              AND newer.scan_type = scan_results.scan_type
+              AND (newer.scan_time > scan_results.scan_time
+                   OR (newer.scan_time = scan_results.scan_time AND newer.id > scan_results.id))
+        )
+    """,
+    # PostgreSQL：DISTINCT ON 一次排序选出保留行，EXCEPT 得到其余行
+    "postgresql": """
+        SELECT id FROM scan_results
+        EXCEPT
+        (SELECT DISTINCT ON (device_id, scan_type) id
+         FROM scan_results
+         ORDER BY device_id, scan_type, scan_time DESC NULLS LAST, id DESC)
+    """,
+}
+
+# 其他数据库（如MySQL 8）：窗口函数
+GENERIC_DUPLICATE_IDS_SQL = """
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY device_id, scan_type ORDER BY scan_time DESC, id DESC
+        ) AS rn
+        FROM scan_results
+    ) ranked
+    WHERE rn > 1
+"""
+
+# 报告重复组时只列出重复最多的前N组，其余只计数
+REPORT_TOP_N = 5
+
+# 分批删除循环中每批都执行的两条语句：在模块级构造一次并声明参数类型，
+# 循环内只绑定参数执行，SQL文本不变，编译缓存和sqlite3语句缓存都能命中
+NEXT_BATCH_UPPER_ID = text("""
+    SELECT MAX(id) FROM (
+        SELECT id FROM dup_ids WHERE id > :last_id ORDER BY id LIMIT :batch_size
+    ) AS batch
+""").bindparams(bindparam("last_id", type_=Integer), bindparam("batch_size", type_=Integer))
+
+DELETE_BATCH = text("""
+    DELETE FROM scan_results
+    WHERE id IN (SELECT id FROM dup_ids WHERE id > :last_id AND id <= :upper_id)
+""").bindparams(bindparam("last_id", type_=Integer), bindparam("upper_id", type_=Integer))
+
+# collect_scan_summary()的单条统计查询
+SCAN_SUMMARY = text("""
+    WITH g AS (
+        SELECT device_id, scan_type, COUNT(*) AS n
+        FROM scan_results
+        GROUP BY device_id, scan_type
+    )
+    SELECT 'total' AS kind, NULL AS device_id, NULL AS scan_type, SUM(n) AS count, NULL AS extra FROM g
+    UNION ALL
+    SELECT 'duplicate', device_id, scan_type, n, NULL FROM g WHERE n > 1
+    UNION ALL
+    SELECT 'by_type', NULL, scan_type, SUM(n), COUNT(DISTINCT device_id) FROM g GROUP BY scan_type
+    UNION ALL
+    SELECT * FROM (
+        SELECT 'by_device', device_id, NULL, SUM(n), NULL FROM g
+        GROUP BY device_id ORDER BY SUM(n) DESC LIMIT 10
+    ) AS top_devices
+""")
+
+# duplicate_fraction()用：总行数和重复行数（每组超出1的部分）
+DUPLICATE_FRACTION = text("""
+    SELECT SUM(n), SUM(n - 1) FROM (
+        SELECT COUNT(*) AS n FROM scan_results GROUP BY device_id, scan_type
+    ) AS group_sizes
+""")
+
+# verify_one_result_per_device()用：重复组数、设备数和扫描结果数一条语句返回
+VERIFY_COUNTS = text("""
+    SELECT
+        (SELECT COUNT(*) FROM (
+            SELECT 1 FROM scan_results
             GROUP BY device_id, scan_type
             HAVING COUNT(*) > 1
-            ORDER BY duplicate_count DESC
-        """)
-        
-        duplicates = db.execute(duplicates_query).fetchall()
-        
-        if not duplicates:
-            print("✅ 没有发现重复的扫描结果")
-            return
-        
-        print(f"   发现 {len(duplicates)} 个设备有重复扫描结果:")
-        for dup in duplicates:
-            device_id, scan_type, total, duplicate = dup
-            print(f"      - 设备ID {device_id}, {scan_type}: 总计 {total}, 重复 {duplicate}")
-        
-        # 3. 删除重复记录
-        delete_query = text("""
-            DELETE FROM scan_results 
-            WHERE id IN (
-                SELECT id FROM (
-                    SELECT 
-                        id,
-                        ROW_NUMBER() OVER (
-                            PARTITION BY device_id, scan_type 
-                            ORDER BY scan_time DESC
-                        ) as rn
-                    FROM scan_results
-                ) ranked
-                WHERE rn > 1
+        ) AS duplicate_group_rows) AS duplicate_groups,
+        (SELECT COUNT(*) FROM devices) AS device_count,
+        (SELECT COUNT(*) FROM scan_results) AS scan_result_count
+""")
+
+def format_duplicate_groups(groups):
+    """把(device_id, scan_type, count)列表格式化为一行文本
+
+    Args:
+        groups: (device_id, scan_type, count) 元组列表
+
+    Returns:
+        str: 形如 "设备ID 3/port_scan: 5 条, 设备ID 7/os_scan: 2 条"
+    """
+    return ", ".join(f"设备ID {device_id}/{scan_type}: {count} 条" for device_id, scan_type, count in groups)
+
+def migrate_target_ip_to_integer(engine=None):
+    """把旧数据库中以文本存储的scan_results.target_ip迁移为整数列（IPv4Integer）
+
+    SQLite会把整数按列的TEXT亲和性转回文本，因此必须重建该列：
+    新增INTEGER列 -> 转换数据 -> 删除旧列 -> 重命名（需要SQLite 3.35+）。
+    SQLite不允许删除被索引引用的列，涉及target_ip的索引先删除，换列后按原定义重建。
+    API启动时由ensure_schema()调用，已是整数列或表尚不存在时直接返回。
+
+    Args:
+        engine: 要迁移的数据库引擎，默认get_engine()
+
+    Returns:
+        bool: 是否执行了迁移
+    """
+    from db.models import IPv4Integer
+    
+    ip_type = IPv4Integer()
+    with (engine or get_engine()).begin() as conn:
+        # PRAGMA和create_function都是SQLite专有；其他数据库由create_all直接建成INTEGER列
+        if conn.dialect.name != "sqlite":
+            return False
+        columns = {row[1]: row[2] for row in conn.execute(text("PRAGMA table_info(scan_results)"))}
+        if not columns or columns.get("target_ip", "").upper() == "INTEGER":
+            return False
+        logger.info("🔧 迁移 scan_results.target_ip 为整数存储...")
+        conn.connection.create_function(
+            "ipv4_to_int", 1, lambda value: ip_type.process_bind_param(value, None)
+        )
+        conn.execute(text("ALTER TABLE scan_results ADD COLUMN target_ip_int INTEGER"))
+        conn.execute(text("UPDATE scan_results SET target_ip_int = ipv4_to_int(target_ip)"))
+        # 自动索引（sql为NULL）只来自UNIQUE/PRIMARY KEY约束，target_ip上没有
+        target_ip_indexes = [
+            (name, sql) for name, sql in conn.execute(text(
+                "SELECT name, sql FROM sqlite_master "
+                "WHERE type = 'index' AND tbl_name = 'scan_results' AND sql IS NOT NULL"
+            )).all()
+            if any(row[2] == "target_ip" for row in conn.execute(text(f'PRAGMA index_info("{name}")')))
+        ]
+        for name, _ in target_ip_indexes:
+            conn.execute(text(f'DROP INDEX "{name}"'))
+        conn.execute(text("ALTER TABLE scan_results DROP COLUMN target_ip"))
+        conn.execute(text("ALTER TABLE scan_results RENAME COLUMN target_ip_int TO target_ip"))
+        for _, sql in target_ip_indexes:
+            conn.execute(text(sql))
+    return True
+
+def ensure_scan_result_indexes(conn, unique):
+    """为已存在的数据库补建ScanResult上的索引（create_all不会修改已有的表）
+
+    Args:
+        conn: 数据库连接（调用方负责事务）
+        unique: True只建唯一索引（必须在去重之后），False只建普通索引
+    """
+    from db.models import ScanResult
+    
+    for index in ScanResult.__table__.indexes:
+        if bool(index.unique) == unique:
+            index.create(bind=conn, checkfirst=True)
+
+def collect_scan_summary(db):
+    """一次查询得到清理后的全部统计
+
+    scan_results只按(device_id, scan_type)聚合一次（可走复合索引），
+    总数、剩余重复、按类型统计和前10设备都从这个小结果集派生。
+
+    Args:
+        db: 数据库连接
+
+    Returns:
+        dict: total, duplicates, by_type, top_devices
+    """
+    rows = db.execute(SCAN_SUMMARY)
+    
+    summary = {"total": 0, "duplicates": [], "by_type": [], "top_devices": []}
+    for kind, device_id, scan_type, count, extra in rows:
+        if kind == "total":
+            summary["total"] = count or 0
+        elif kind == "duplicate":
+            summary["duplicates"].append((device_id, scan_type, count))
+        elif kind == "by_type":
+            summary["by_type"].append((scan_type, count, extra))
+        else:
+            summary["top_devices"].append((device_id, count))
+    summary["top_devices"].sort(key=lambda item: item[1], reverse=True)
+    return summary
+
+def delete_duplicates_in_batches(conn, batch_size=DEFAULT_BATCH_SIZE):
+    """分批删除重复的扫描结果，每批单独提交以限制事务大小和日志增长
+
+    先把所有待删除的id收集到临时表，然后按id区间分批删除并提交。
+    临时表属于单个连接，因此整个过程使用同一个连接。
+
+    Args:
+        conn: 数据库连接（不能处于事务中，每批自行开启事务）
+        batch_size: 每批删除的记录数；<=0 表示在单个事务中一次删除全部
+
+    Returns:
+        int: 删除的记录总数
+    """
+    if batch_size <= 0:
+        # 不限制每批大小：只执行一批，一次提交
+        batch_size = sys.maxsize
+    dialect = conn.dialect.name
+    duplicate_ids_sql = DUPLICATE_IDS_SQL.get(dialect, GENERIC_DUPLICATE_IDS_SQL)
+    deleted_total = 0
+    with conn.begin():
+        conn.execute(text("DROP TABLE IF EXISTS dup_ids"))
+        conn.execute(text("CREATE TEMP TABLE dup_ids (id INTEGER PRIMARY KEY)"))
+        conn.execute(text("INSERT INTO dup_ids (id) " + duplicate_ids_sql))
+    
+    last_id = 0
+    while True:
+        with conn.begin():
+            upper_id = conn.execute(
+                NEXT_BATCH_UPPER_ID, {"last_id": last_id, "batch_size": batch_size}
+            ).scalar()
+            if upper_id is None:
+                break
+            deleted = conn.execute(
+                DELETE_BATCH, {"last_id": last_id, "upper_id": upper_id}
+            ).rowcount
+        deleted_total += deleted
+        last_id = upper_id
+        logger.info("   已删除 %d 条重复记录...", deleted_total)
+    
+    with conn.begin():
+        conn.execute(text("DROP TABLE IF EXISTS dup_ids"))
+    
+    # 大量删除后WAL文件会变大：检查点写回主库并把WAL截断为0
+    if deleted_total and dialect == "sqlite":
+        with conn.begin():
+            conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+    return deleted_total
+
+def duplicate_fraction(conn):
+    """计算重复记录占scan_results总行数的比例
+
+    Args:
+        conn: 数据库连接（不能处于事务中）
+
+    Returns:
+        float: 重复行数 / 总行数（空表为0）
+    """
+    with conn.begin():
+        total, duplicates = conn.execute(DUPLICATE_FRACTION).one()
+    return (duplicates or 0) / total if total else 0.0
+
+def swap_in_latest_only(conn):
+    """以"复制保留行-清空-写回"的方式去重，适用于重复占比很高的表
+
+    只顺序复制每组最新的一行到临时表，DELETE不带WHERE时SQLite走截断优化
+    直接释放整表页面，再把保留行写回。表结构、索引和外键声明保持不变。
+
+    Args:
+        conn: 数据库连接（不能处于事务中）
+
+    Returns:
+        int: 删除的记录数
+    """
+    with conn.begin():
+        total = conn.execute(text("SELECT COUNT(*) FROM scan_results")).scalar()
+        conn.execute(text("DROP TABLE IF EXISTS temp.scan_results_keep"))
+        conn.execute(text("""
+            CREATE TEMP TABLE scan_results_keep AS
+            SELECT * FROM scan_results
+            WHERE NOT EXISTS (
+                SELECT 1 FROM scan_results newer
+                WHERE newer.device_id IS scan_results.device_id
+                  AND newer.scan_type = scan_results.scan_type
+                  AND (newer.scan_time > scan_results.scan_time
+                       OR (newer.scan_time = scan_results.scan_time AND newer.id > scan_results.id))
             )
-        """)
-        
-        result = db.execute(delete_query)
-        db.commit()
-        
-        # 4. 统计清理后的数据
-        total_after = db.query(ScanResult).count()
-        deleted_count = total_before - total_after
+        """))
+        conn.execute(text("DELETE FROM scan_results"))
+        kept = conn.execute(text("INSERT INTO scan_results SELECT * FROM temp.scan_results_keep")).rowcount
+        conn.execute(text("DROP TABLE temp.scan_results_keep"))
+    return total - kept
+
+def cleanup_duplicate_scan_results(batch_size=DEFAULT_BATCH_SIZE, report=True, swap=False):
+    """清理重复的扫描结果
+
+    脚本只执行原生SQL，不需要ORM会话：整个清理复用同一个连接，
+    每个步骤用conn.begin()划分事务。
+
+    Args:
+        batch_size: 每批删除的记录数
+        report: 删除前是否查询并列出重复记录
+        swap: 重复占比超过SWAP_THRESHOLD时改用swap_in_latest_only()
+    """
+    try:
+        with get_engine().connect() as conn:
+            with conn.begin():
+                ensure_scan_result_indexes(conn, unique=False)
+            logger.info("🔍 开始清理重复的扫描结果...")
+            
+            # 0. 先廉价地判断是否存在重复：找到第一组即停止，没有重复时跳过后续全部步骤
+            with conn.begin():
+                has_duplicates = conn.execute(text("""
+                    SELECT EXISTS (
+                        SELECT 1 FROM scan_results
+                        GROUP BY device_id, scan_type
+                        HAVING COUNT(*) > 1
+                    )
+                """)).scalar()
+            if not has_duplicates:
+                logger.info("✅ 没有发现重复的扫描结果")
+                with conn.begin():
+                    ensure_scan_result_indexes(conn, unique=True)
+                return
+            
+            # 刷新scan_results的统计信息，让反连接和分批删除按索引规划；
+            # analysis_limit让ANALYZE只抽样每个索引的部分行，代价远小于全表扫描
+            with conn.begin():
+                if conn.dialect.name == "sqlite":
+                    conn.execute(text("PRAGMA analysis_limit=1000"))
+                conn.execute(text("ANALYZE scan_results"))
+            
+            # 1. 查找并报告重复记录（--no-report时跳过，直接删除）
+            if report:
+                duplicates_query = text("""
+                    SELECT 
+                        device_id,
+                        scan_type,
+                        COUNT(*) as total_count,
+                        COUNT(*) - 1 as duplicate_count
+                    FROM scan_results 
+                    GROUP BY device_id, scan_type
+                    HAVING COUNT(*) > 1
+                    ORDER BY duplicate_count DESC
+                """)
+                
+                # 逐行迭代结果而不是fetchall()，只保留前REPORT_TOP_N组用于输出，
+                # 其余只计数，避免重复组很多时逐行写终端
+                group_count = 0
+                top_groups = []
+                with conn.begin():
+                    for device_id, scan_type, total, duplicate in conn.execute(duplicates_query):
+                        group_count += 1
+                        if len(top_groups) < REPORT_TOP_N:
+                            top_groups.append((device_id, scan_type, total))
+                
+                logger.info("   共 %d 组重复扫描结果，最多的: %s", group_count, format_duplicate_groups(top_groups))
+            
+            # 2. 删除重复记录；删除数直接取自DELETE的rowcount，无需前后两次COUNT(*)
+            # swap依赖SQLite的temp库和截断优化，其他数据库始终分批删除
+            if swap and conn.dialect.name == "sqlite" and duplicate_fraction(conn) > SWAP_THRESHOLD:
+                logger.info("   重复占比超过 %d%%，使用复制保留行方式清理", int(SWAP_THRESHOLD * 100))
+                deleted_count = swap_in_latest_only(conn)
+            else:
+                deleted_count = delete_duplicates_in_batches(conn, batch_size)
+            
+            # 去重完成后建立唯一索引，之后由写入端的ON CONFLICT保证不再产生重复
+            # 3. 一次聚合得到清理后的全部统计
+            with conn.begin():
+                ensure_scan_result_indexes(conn, unique=True)
+                summary = collect_scan_summary(conn)
         
-        print(f"\n✅ 清理完成!")
-        print(f"   删除重复记录数: {deleted_count}")
-        print(f"   清理后总扫描结果数: {total_after}")
-        print(f"   节省存储空间: 约 {deleted_count} 条记录")
+        total_after = summary["total"]
         
-        # 5. 验证清理结果
-        remaining_duplicates = db.execute(text("""
-            SELECT 
-                device_id,
-                scan_type,
-                COUNT(*) as count
-            FROM scan_results 
-            GROUP BY device_id, scan_type
-            HAVING COUNT(*) > 1
-        """)).fetchall()
+        logger.info("\n✅ 清理完成!")
+        logger.info("   删除重复记录数: %d", deleted_count)
+        logger.info("   清理后总扫描结果数: %d", total_after)
+        logger.info("   节省存储空间: 约 %d 条记录", deleted_count)
         
+        # 4. 验证清理结果
+        remaining_duplicates = summary["duplicates"]
         if not remaining_duplicates:
-            print("✅ 验证通过: 没有重复记录")
+            logger.info("✅ 验证通过: 没有重复记录")
         else:
-            print("⚠️  警告: 仍有重复记录:")
-            for dup in remaining_duplicates:
-                print(f"      - 设备ID {dup[0]}, {dup[1]}: {dup[2]} 条")
-        
-        # 6. 显示清理后的统计
-        print(f"\n📊 清理后的统计信息:")
-        type_stats = db.execute(text("""
-            SELECT 
-                scan_type,
-                COUNT(*) as count,
-                COUNT(DISTINCT device_id) as unique_devices
-            FROM scan_results 
-            GROUP BY scan_type
-        """)).fetchall()
-        
-        for stat in type_stats:
-            scan_type, count, unique_devices = stat
-            print(f"   {scan_type}: {count} 条结果, {unique_devices} 个唯一设备")
+            logger.warning("⚠️  警告: 仍有 %d 组重复记录: %s", len(remaining_duplicates),
+                           format_duplicate_groups(remaining_duplicates[:REPORT_TOP_N]))
         
-        device_stats = db.execute(text("""
-            SELECT 
-                device_id,
-                COUNT(*) as scan_count
-            FROM scan_results 
-            GROUP BY device_id
-            ORDER BY scan_count DESC
-            LIMIT 10
-        """)).fetchall()
+        # 5. 显示清理后的统计
+        logger.info("\n📊 清理后的统计信息:")
+        for scan_type, count, unique_devices in summary["by_type"]:
+            logger.info("   %s: %d 条结果, %d 个唯一设备", scan_type, count, unique_devices)
         
-        print(f"\n   扫描结果最多的前10个设备:")
-        for stat in device_stats:
-            device_id, scan_count = stat
-            print(f"      - 设备ID {device_id}: {scan_count} 条扫描结果")
+        logger.debug("\n   扫描结果最多的前10个设备:")
+        for device_id, scan_count in summary["top_devices"]:
+            logger.debug("      - 设备ID %s: %d 条扫描结果", device_id, scan_count)
         
     except Exception as e:
-        db.rollback()
-        print(f"❌ 清理过程中出错: {e}")
+        logger.error("❌ 清理过程中出错: %s", e)
         raise
-    finally:
-        db.close()
+
+def vacuum_database():
+    """VACUUM回收删除后留下的空闲页，并用PRAGMA optimize为下次运行刷新统计信息
+
+    VACUUM不能在事务中执行，因此使用AUTOCOMMIT连接。
+    """
+    logger.info("\n🗜️  正在压缩数据库...")
+    with get_engine().connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM"))
+        if conn.dialect.name == "sqlite":
+            conn.execute(text("PRAGMA optimize"))
+    logger.info("✅ 数据库压缩完成")
 
 def verify_one_result_per_device():
-    """验证每个设备每种扫描类型只有一个结果"""
-    db = SessionLocal()
+    """验证每个设备每种扫描类型只有一个结果
+
+    重复组数、设备数和扫描结果数由一条语句返回，只有验证失败时才再查询重复明细。
+    """
     try:
-        print("\n🔍 验证清理结果...")
+        logger.info("\n🔍 验证清理结果...")
+        with get_engine().connect() as conn:
+            with conn.begin():
+                duplicate_groups, device_count, scan_result_count = conn.execute(VERIFY_COUNTS).one()
+                
+                if duplicate_groups:
+                    top_groups = conn.execute(text("""
+                        SELECT device_id, scan_type, COUNT(*) AS count
+                        FROM scan_results
+                        GROUP BY device_id, scan_type
+                        HAVING COUNT(*) > 1
+                        ORDER BY count DESC
+                        LIMIT :limit
+                    """), {"limit": REPORT_TOP_N}).fetchall()
+                    logger.error("❌ 验证失败: 仍有 %d 组重复记录: %s", duplicate_groups,
+                                 format_duplicate_groups(top_groups))
+                    return False
         
-        # 检查是否还有重复
-        duplicates = db.execute(text("""
-            SELECT 
-                device_id,
-                scan_type,
-                COUNT(*) as count
-            FROM scan_results 
-            GROUP BY device_id, scan_type
-            HAVING COUNT(*) > 1
-        """)).fetchall()
+        logger.info("✅ 验证通过: 每个设备每种扫描类型只有一个结果")
         
-        if not duplicates:
-            print("✅ 验证通过: 每个设备每种扫描类型只有一个结果")
-            
-            # 显示设备统计
-            device_count = db.query(Device).count()
-            scan_result_count = db.query(ScanResult).count()
-            
-            print(f"   设备总数: {device_count}")
-            print(f"   扫描结果总数: {scan_result_count}")
-            print(f"   平均每个设备: {scan_result_count/device_count:.2f} 条扫描结果")
-            
-            return True
-        else:
-            print("❌ 验证失败: 仍有重复记录:")
-            for dup in duplicates:
-                print(f"   - 设备ID {dup[0]}, {dup[1]}: {dup[2]} 条")
-            return False
+        # 显示设备统计
+        logger.info("   设备总数: %d", device_count)
+        logger.info("   扫描结果总数: %d", scan_result_count)
+        if device_count:
+            logger.info("   平均每个设备: %.2f 条扫描结果", scan_result_count / device_count)
+        
+        return True
             
     except Exception as e:
-        print(f"❌ 验证过程中出错: {e}")
+        logger.error("❌ 验证过程中出错: %s", e)
         return False
-    finally:
-        db.close()
 
 if __name__ == "__main__":
-    print("🧹 扫描结果重复数据清理工具")
-    print("=" * 50)
+    parser = argparse.ArgumentParser(description="清理重复的扫描结果")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"每批删除的记录数，0表示单个事务一次删除 (默认: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--report", action=argparse.BooleanOptionalAction, default=True,
+                        help="删除前列出重复记录 (--no-report 跳过该查询)")
+    parser.add_argument("--swap", action="store_true",
+                        help=f"重复占比超过{int(SWAP_THRESHOLD * 100)}%%时复制保留行并清空原表，而不是逐行删除")
+    parser.add_argument("--vacuum", action="store_true",
+                        help="清理后执行VACUUM回收空间（会重写整个数据库文件）")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="输出逐条的重复记录和设备统计")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(message)s")
+    
+    logger.info("🧹 扫描结果重复数据清理工具")
+    logger.info("=" * 50)
     
     try:
+        # 迁移旧的文本target_ip列
+        migrate_target_ip_to_integer()
+        
         # 执行清理
-        cleanup_duplicate_scan_results()
+        cleanup_duplicate_scan_results(batch_size=args.batch_size, report=args.report, swap=args.swap)
         
         # 验证结果
         verify_one_result_per_device()
         
-        print("\n🎉 清理和验证完成!")
+        if args.vacuum:
+            vacuum_database()
+        
+        logger.info("\n🎉 清理和验证完成!")
         
     except Exception as e:
-        print(f"\n❌ 脚本执行失败: {e}")
+        logger.error("\n❌ 脚本执行失败: %s", e)
         sys.exit(1)
@@ -4,18 +4,41 @@
 用于重新创建数据库表结构，确保IP地址的唯一性约束
 """
 
-from project.db.base import engine, Base, SessionLocal
-from project.db.models import Device, Experiment, Capture, ScanResult, PortInfo
-from sqlalchemy import MetaData
+import sys
 import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def init_database():
-    """初始化数据库"""
-    print("正在删除现有数据库表...")
-    Base.metadata.drop_all(bind=engine)
+from db.base import engine, Base
+from db.models import Device, Experiment, Capture, ScanResult, PortInfo
+from db.cleanup_duplicate_scans import migrate_target_ip_to_integer
+from sqlalchemy import select, func, text
+
+def init_database(reset=False):
+    """初始化数据库
+
+    默认只用create_all(checkfirst=True)补建缺失的表，已存在的表和数据保持不变；
+    reset=True时才先删除所有表再重建。表结构直接取自Base.metadata，不反射现有数据库。
+
+    Args:
+        reset: 是否删除现有表后重建
+    """
+    if reset:
+        print("正在删除现有数据库表...")
+        Base.metadata.drop_all(bind=engine)
+    
+    print("正在创建缺失的数据库表...")
+    Base.metadata.create_all(bind=engine, checkfirst=True)
     
-    print("正在创建新的数据库表...")
-    Base.metadata.create_all(bind=engine)
+    # 先把旧库中文本存储的target_ip迁移为整数，再补建索引：
+    # 否则target_ip上的索引会建在TEXT列上，并让之后的换列迁移失败
+    if migrate_target_ip_to_integer(engine):
+        print("已将 scan_results.target_ip 迁移为整数存储")
+    
+    # create_all不会给已存在的表补建索引（例如新增的外键索引），逐个检查并补建
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if not index.unique:
+                index.create(bind=engine, checkfirst=True)
     
     print("数据库初始化完成！")
     print("已添加以下唯一性约束：")
@@ -23,65 +46,79 @@ def init_database():
     print("- Device.mac_address: 唯一且不可为空")
     print("- ScanResult.target_ip: 唯一且不可为空")
 
+def clear_database():
+    """清空所有表的数据，保留表结构和索引
+
+    在一个事务内按外键依赖的逆序DELETE，不执行任何DDL；
+    之后VACUUM回收空间（VACUUM不能在事务中执行）。
+    """
+    print("正在清空数据库表数据...")
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM"))
+    print("数据已清空，表结构和索引保持不变")
+
 def test_database():
-    """测试数据库功能"""
+    """测试数据库功能
+
+    使用SQLAlchemy Core在单个事务内完成插入、查询和清理，
+    不经过ORM的unit-of-work、identity map和refresh查询。
+    """
     print("\n正在测试数据库功能...")
-    db = SessionLocal()
+    devices_table = Device.__table__
+    scan_results_table = ScanResult.__table__
     try:
-        # 插入测试设备
-        device = Device(
-            ip_address='10.12.0.100',
-            mac_address='00:11:22:33:44:55',
-            hostname='test-device',
-            os_info='Linux',
-            status='online'
-        )
-        db.add(device)
-        db.commit()
-        db.refresh(device)
-        print(f"✓ 插入设备成功: {device.id}, {device.ip_address}")
+        with engine.begin() as conn:
+            # 插入测试设备
+            device_id = conn.execute(devices_table.insert(), {
+                "ip_address": '10.12.0.100',
+                "mac_address": '00:11:22:33:44:55',
+                "hostname": 'test-device',
+                "os_info": 'Linux',
+                "status": 'online'
+            }).inserted_primary_key[0]
+            print(f"✓ 插入设备成功: {device_id}, 10.12.0.100")
 
-        # 插入扫描结果
-        scan_result = ScanResult(
-            device_id=device.id,
-            scan_type='port_scan',
-            target_ip='10.12.0.100',
-            scan_duration=30,
-            status='success'
-        )
-        db.add(scan_result)
-        db.commit()
-        print(f"✓ 插入扫描结果成功: {scan_result.id}, {scan_result.target_ip}")
+            # 插入扫描结果（传入字典列表即为executemany）
+            conn.execute(scan_results_table.insert(), [{
+                "device_id": device_id,
+                "scan_type": 'port_scan',
+                "target_ip": '10.12.0.100',
+                "scan_duration": 30,
+                "status": 'success'
+            }])
+            print("✓ 插入扫描结果成功: 10.12.0.100")
 
-        # 查询所有设备
-        devices = db.query(Device).all()
-        print(f"✓ 查询设备成功: {[d.ip_address for d in devices]}")
+            # 查询所有设备
+            device_count = conn.execute(select(func.count()).select_from(devices_table)).scalar()
+            print(f"✓ 查询设备成功: 共 {device_count} 个设备")
 
-        # 查询所有扫描结果
-        scan_results = db.query(ScanResult).all()
-        print(f"✓ 查询扫描结果成功: {[s.target_ip for s in scan_results]}")
+            # 查询所有扫描结果
+            scan_result_count = conn.execute(select(func.count()).select_from(scan_results_table)).scalar()
+            print(f"✓ 查询扫描结果成功: 共 {scan_result_count} 条扫描结果")
 
-        # 清理测试数据
-        db.delete(scan_result)
-        db.delete(device)
-        db.commit()
-        print("✓ 清理测试数据成功")
+            # 清理测试数据
+            conn.execute(scan_results_table.delete().where(scan_results_table.c.device_id == device_id))
+            conn.execute(devices_table.delete().where(devices_table.c.id == device_id))
+            print("✓ 清理测试数据成功")
         
     except Exception as e:
         print(f"✗ 测试失败: {e}")
-        db.rollback()
-    finally:
-        db.close()
 
 if __name__ == '__main__':
     # 检查数据库文件是否存在
     db_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'iotlab.db')
+    reset = False
     if os.path.exists(db_path):
         print(f"发现现有数据库文件: {db_path}")
-        response = input("是否要重新初始化数据库？这将删除所有现有数据 (y/N): ")
-        if response.lower() != 'y':
-            print("取消操作")
-            exit()
+        response = input("是否要重新初始化数据库？y=删除并重建所有表, c=只清空数据保留表结构 (y/c/N): ").lower()
+        if response == 'c':
+            clear_database()
+        reset = response == 'y'
+        if response not in ('y', 'c'):
+            print("保留现有数据，仅创建缺失的表")
     
-    init_database()
-    test_database()
\ No newline at end of file
+    init_database(reset=reset)
+    test_database()
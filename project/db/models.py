@@ -1,8 +1,62 @@
-import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON, Float
-from sqlalchemy.orm import relationship
+import ipaddress
+import zlib
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON, Float, Index, LargeBinary, func
+from sqlalchemy.orm import deferred, relationship
+from sqlalchemy.types import TypeDecorator
 from .base import Base
 
+# Timestamp columns default to func.now() (CURRENT_TIMESTAMP, UTC, whole seconds):
+# the INSERT fills them in SQL, so no Python datetime is built per row. The
+# server_default covers raw-SQL inserts on databases created from these models.
+
+class IPv4Integer(TypeDecorator):
+    """
+    Stores IPv4 addresses as 32-bit integers while exposing them as dotted strings.
+
+    Anything that is not an IPv4 address (e.g. IPv6) is stored unchanged;
+    SQLite keeps non-numeric text as-is in an INTEGER column.
+    """
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, int):
+            return value
+        try:
+            return int(ipaddress.IPv4Address(value))
+        except ValueError:
+            return value
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, str) and value.isdigit():
+            value = int(value)
+        if isinstance(value, int):
+            return str(ipaddress.IPv4Address(value))
+        return value
+
+class CompressedText(TypeDecorator):
+    """
+    Stores text zlib-compressed as a BLOB while exposing it as a str.
+
+    Rows written before compression was introduced hold plain text; those
+    values are returned unchanged.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    # Fast compression level: nmap output still shrinks several-fold
+    COMPRESS_LEVEL = 1
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return zlib.compress(value.encode('utf-8'), self.COMPRESS_LEVEL)
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, str):
+            return value
+        return zlib.decompress(value).decode('utf-8')
+
 class Device(Base):
     """
     Device model representing a discovered IoT device in the lab.
@@ -16,16 +70,20 @@ class Device(Base):
         port: Port information (e.g., "55443", "8080").
         os_info: Operating system information.
         last_seen: Timestamp of last discovery (optional).
+        scan_results: ORM relationship to the device's scan results.
     """
     __tablename__ = 'devices'
     id = Column(Integer, primary_key=True, index=True)
     ip_address = Column(String, index=True, nullable=True)  # 允许NULL，移除唯一性约束
     mac_address = Column(String, index=True, nullable=False, unique=True) # unique
     hostname = Column(String)
-    status = Column(String)
+    status = Column(String, index=True)
     port = Column(String, nullable=True)
     os_info = Column(String, nullable=True)
-    last_seen = Column(DateTime, default=datetime.datetime.utcnow)
+    last_seen = Column(DateTime, default=func.now(), server_default=func.now())
+
+    # ORM relationships
+    scan_results = relationship('ScanResult', back_populates='device')
 
 class Capture(Base):
     """
@@ -39,16 +97,20 @@ class Capture(Base):
         experiment_id: Foreign key to the related experiment.
         file_size: Size of the PCAP file in bytes.
         description: Optional description of the capture.
+        experiment: ORM relationship to the related experiment.
     """
     __tablename__ = 'captures'
     id = Column(Integer, primary_key=True, index=True)
     file_name = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
-    experiment_id = Column(Integer, ForeignKey('experiments.id'))
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
+    experiment_id = Column(Integer, ForeignKey('experiments.id'), index=True)
     file_size = Column(Integer)
     description = Column(String)
 
+    # ORM relationships
+    experiment = relationship('Experiment', back_populates='captures', foreign_keys=[experiment_id])
+
 class Experiment(Base):
     """
     Experiment model representing a flooding attack experiment.
@@ -75,7 +137,7 @@ class Experiment(Base):
         attack_mode: Attack mode (single/cyclic).
         current_cycle: Current cycle number during execution.
         total_cycles: Total number of cycles for this experiment.
-        attack_results: JSON field storing detailed attack results.
+        attack_results: JSON field storing detailed attack results (deferred).
     """
     __tablename__ = 'experiments'
     id = Column(Integer, primary_key=True, index=True)
@@ -84,11 +146,11 @@ class Experiment(Base):
     target_ip = Column(String, nullable=False)
     port = Column(Integer, default=55443)
     status = Column(String)
-    start_time = Column(DateTime, default=datetime.datetime.utcnow)
+    start_time = Column(DateTime, default=func.now(), server_default=func.now())
     end_time = Column(DateTime)
     result = Column(Text)
     duration_sec = Column(Integer, nullable=True)
-    capture_id = Column(Integer, ForeignKey('captures.id'))
+    capture_id = Column(Integer, ForeignKey('captures.id'), index=True)
     
     # New fields for Attack Engine V2
     interface = Column(String, default="wlan0")
@@ -97,11 +159,11 @@ class Experiment(Base):
     attack_mode = Column(String, default="single")  # single/cyclic
     current_cycle = Column(Integer, default=0)
     total_cycles = Column(Integer, default=1)
-    attack_results = Column(Text)  # JSON field for storing detailed results
+    attack_results = deferred(Column(Text))  # JSON field for storing detailed results (loaded on access)
 
     # ORM relationships
     capture = relationship('Capture', foreign_keys=[capture_id])
-    captures = relationship('Capture', backref='experiment', foreign_keys=[Capture.experiment_id])
+    captures = relationship('Capture', back_populates='experiment', foreign_keys=[Capture.experiment_id])
 
 class ScanResult(Base):
     """
@@ -111,34 +173,52 @@ class ScanResult(Base):
         id: Primary key.
         device_id: Foreign key to the related device.
         scan_type: Type of scan (port_scan, os_scan).
-        target_ip: Target IP address for the scan.
+        target_ip: Target IP address for the scan (IPv4 stored as a 32-bit integer).
         scan_time: Timestamp when the scan was performed.
         scan_duration: Duration of the scan in seconds.
         ports: JSON field containing port scan results.
         os_guesses: JSON field containing OS detection results.
         os_details: JSON field containing detailed OS information.
-        raw_output: Raw scan output from nmap.
+        raw_output: Raw scan output from nmap (zlib-compressed, deferred).
         command: The nmap command that was executed.
         error: Error message if scan failed.
         status: Scan status (success, failed, running).
     """
     __tablename__ = 'scan_results'
     id = Column(Integer, primary_key=True, index=True)
-    device_id = Column(Integer, ForeignKey('devices.id'))
+    device_id = Column(Integer, ForeignKey('devices.id'))  # 由下方以device_id开头的复合索引覆盖
     scan_type = Column(String, nullable=False)  # 'port_scan' or 'os_scan'
-    target_ip = Column(String, nullable=False)  # 移除唯一性约束，允许同一IP多次扫描
-    scan_time = Column(DateTime, default=datetime.datetime.utcnow)
+    target_ip = Column(IPv4Integer, nullable=False, index=True)  # IPv4以整数存储，允许同一IP多次扫描
+    scan_time = Column(DateTime, default=func.now(), server_default=func.now())
     scan_duration = Column(Integer)  # Duration in seconds
     ports = Column(JSON, nullable=True)  # Port scan results
     os_guesses = Column(JSON, nullable=True)  # OS detection guesses
     os_details = Column(JSON, nullable=True)  # Detailed OS information
-    raw_output = Column(Text, nullable=True)  # Raw nmap output
+    raw_output = deferred(Column(CompressedText, nullable=True))  # Raw nmap output (zlib-compressed, loaded on access)
     command = Column(String, nullable=True)  # The nmap command executed
     error = Column(Text, nullable=True)  # Error message if failed
     status = Column(String, default='success')  # success, failed, running
     
     # ORM relationships
-    device = relationship('Device', backref='scan_results')
+    device = relationship('Device', back_populates='scan_results')
+    port_details = relationship('PortInfo', back_populates='scan_result')
+
+# Covers "latest result per (device, scan type)" lookups and duplicate cleanup
+Index(
+    'ix_scan_results_dev_type_time',
+    ScanResult.device_id,
+    ScanResult.scan_type,
+    ScanResult.scan_time.desc()
+)
+
+# One scan result per device and scan type, enforced at write time
+# (target of INSERT ... ON CONFLICT in update_or_create_scan_result)
+Index(
+    'uq_scan_results_dev_type',
+    ScanResult.device_id,
+    ScanResult.scan_type,
+    unique=True
+)
 
 class PortInfo(Base):
     """
@@ -155,7 +235,7 @@ class PortInfo(Base):
     """
     __tablename__ = 'port_info'
     id = Column(Integer, primary_key=True, index=True)
-    scan_result_id = Column(Integer, ForeignKey('scan_results.id'))
+    scan_result_id = Column(Integer, ForeignKey('scan_results.id'), index=True)
     port_number = Column(Integer, nullable=False)
     protocol = Column(String, nullable=False)  # 'tcp' or 'udp'
     state = Column(String, nullable=False)  # 'open', 'closed', 'filtered'
@@ -163,7 +243,7 @@ class PortInfo(Base):
     version = Column(String, nullable=True)
     
     # ORM relationships
-    scan_result = relationship('ScanResult', backref='port_details') 
+    scan_result = relationship('ScanResult', back_populates='port_details')
 
 class ShellScript(Base):
     """Shell脚本模型"""
@@ -173,22 +253,25 @@ class ShellScript(Base):
     description = Column(Text)
     script_content = Column(Text, nullable=False)
     parameters_schema = Column(JSON)  # 解析出的参数结构
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
+    updated_at = Column(DateTime, default=func.now(), server_default=func.now(), onupdate=func.now())
     status = Column(String, default='active')  # active, inactive, deprecated
     created_by = Column(String, default='system')  # 创建者
     tags = Column(JSON)  # 标签数组
     version = Column(String, default='1.0.0')  # 脚本版本
 
+    # ORM relationships
+    executions = relationship('ScriptExecution', back_populates='script')
+
 class ScriptExecution(Base):
     """脚本执行记录"""
     __tablename__ = 'script_executions'
     id = Column(Integer, primary_key=True, index=True)
-    script_id = Column(Integer, ForeignKey('shell_scripts.id'))
+    script_id = Column(Integer, ForeignKey('shell_scripts.id'), index=True)
     script_name = Column(String)  # 冗余字段，便于查询
     parameters = Column(JSON)  # 用户填写的参数
     status = Column(String, default='pending')  # pending, running, completed, failed, cancelled
-    start_time = Column(DateTime, default=datetime.datetime.utcnow)
+    start_time = Column(DateTime, default=func.now(), server_default=func.now())
     end_time = Column(DateTime)
     output = Column(Text)
     error = Column(Text)
@@ -198,4 +281,4 @@ class ScriptExecution(Base):
     created_by = Column(String, default='system')  # 执行者
     
     # ORM relationships
-    script = relationship('ShellScript', backref='executions') 
\ No newline at end of file
+    script = relationship('ShellScript', back_populates='executions') 
\ No newline at end of file
@@ -3,16 +3,10 @@ from starlette.testclient import TestClient
 import logging
 import sys
 
-from main import app
-
-
-@pytest.fixture(scope="module")
-def test_app():
-    client = TestClient(app)
-    yield client  # testing happens here
-
-
-def pytest_configure(config):
+# Configure logging before importing the app: main and the engines skip their
+# own setup once the root logger has handlers, so every record is written once
+if not logging.getLogger('').handlers:
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s')
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
@@ -22,6 +16,52 @@ def pytest_configure(config):
     )
     console = logging.StreamHandler(sys.stdout)
     console.setLevel(logging.INFO)
-    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s')
     console.setFormatter(formatter)
     logging.getLogger('').addHandler(console)
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from main import app
+from db.base import Base
+from api import captures, devices, experiments, scan_results
+
+
+@pytest.fixture(scope="session")
+def test_app():
+    client = TestClient(app)
+    yield client  # testing happens here
+
+
+@pytest.fixture
+def db_session(tmp_path):
+    """A session on a fresh SQLite file that every router's get_db also yields."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    Base.metadata.create_all(bind=engine)
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = TestingSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    for router_module in (captures, devices, experiments, scan_results):
+        app.dependency_overrides[router_module.get_db] = override_get_db
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+        app.dependency_overrides.clear()
+        engine.dispose()
+
+
+@pytest.fixture
+def client(test_app, db_session):
+    """The test client with the database dependency pointed at db_session's file."""
+    return test_app
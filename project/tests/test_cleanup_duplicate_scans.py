@@ -0,0 +1,180 @@
+# ================== Configuration ==================
+import re
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+
+from db import base
+from db.base import Base
+from db.models import ScanResult
+from db import cleanup_duplicate_scans as cleanup
+
+# (device_id, scan_type, scan_time); ids are assigned in this order starting at 1
+SCAN_ROWS = [
+    (1, "port_scan", "2025-01-01 10:00:00"),  # 1: older
+    (1, "port_scan", "2025-01-02 10:00:00"),  # 2: same time as 3, lower id
+    (1, "port_scan", "2025-01-02 10:00:00"),  # 3: kept
+    (1, "os_scan",   "2025-01-01 10:00:00"),  # 4: kept
+    (2, "port_scan", "2025-01-01 09:00:00"),  # 5: older
+    (2, "port_scan", "2025-01-01 11:00:00"),  # 6: kept
+]
+KEPT_IDS = {3, 4, 6}
+
+# Every statement the cleanup can run on PostgreSQL (the swap path is SQLite-only)
+POSTGRESQL_STATEMENTS = {
+    "duplicate_ids": text(cleanup.DUPLICATE_IDS_SQL["postgresql"]),
+    "generic_duplicate_ids": text(cleanup.GENERIC_DUPLICATE_IDS_SQL),
+    "next_batch_upper_id": cleanup.NEXT_BATCH_UPPER_ID,
+    "delete_batch": cleanup.DELETE_BATCH,
+    "scan_summary": cleanup.SCAN_SUMMARY,
+    "duplicate_fraction": cleanup.DUPLICATE_FRACTION,
+    "verify_counts": cleanup.VERIFY_COUNTS,
+}
+
+# ================== Helper Functions ==================
+@pytest.fixture
+def engine(tmp_path):
+    """A file-backed SQLite database without the unique index, like a pre-migration DB."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'iotlab.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX uq_scan_results_dev_type"))
+        conn.execute(text("INSERT INTO devices (id, mac_address, hostname, status) VALUES (1, 'aa', 'a', 'online'), (2, 'bb', 'b', 'online')"))
+        for device_id, scan_type, scan_time in SCAN_ROWS:
+            conn.execute(text("""
+                INSERT INTO scan_results (device_id, scan_type, target_ip, scan_time, status)
+                VALUES (:device_id, :scan_type, 168427521, :scan_time, 'success')
+            """), {"device_id": device_id, "scan_type": scan_type, "scan_time": scan_time})
+    yield engine
+    engine.dispose()
+
+def unaliased_derived_tables(sql):
+    """Return the FROM (...) subqueries not followed by an alias, which PostgreSQL < 16 rejects."""
+    unaliased = []
+    for match in re.finditer(r"\bFROM\s*\(", sql, re.IGNORECASE):
+        depth, end = 1, match.end()
+        while depth:
+            depth += {"(": 1, ")": -1}.get(sql[end], 0)
+            end += 1
+        following = sql[end:].lstrip()
+        if not re.match(r"(AS\s+)?(?!(WHERE|GROUP|ORDER|UNION|EXCEPT|HAVING|LIMIT)\b)[A-Za-z_]\w*", following, re.IGNORECASE):
+            unaliased.append(sql[match.start():end])
+    return unaliased
+
+def remaining_ids(engine):
+    with engine.connect() as conn:
+        return {row[0] for row in conn.execute(text("SELECT id FROM scan_results"))}
+
+# ================== Test Cases ==================
+def test_swap_in_latest_only_keeps_latest_row_per_group(engine):
+    with engine.connect() as conn:
+        deleted = cleanup.swap_in_latest_only(conn)
+    assert deleted == len(SCAN_ROWS) - len(KEPT_IDS)
+    assert remaining_ids(engine) == KEPT_IDS
+
+def test_cleanup_with_swap_deduplicates_and_adds_unique_index(engine, monkeypatch):
+    monkeypatch.setattr(cleanup, "get_engine", lambda: engine)
+    with engine.connect() as conn:
+        assert cleanup.duplicate_fraction(conn) > cleanup.SWAP_THRESHOLD
+
+    cleanup.cleanup_duplicate_scan_results(swap=True)
+
+    assert remaining_ids(engine) == KEPT_IDS
+    with engine.connect() as conn:
+        unique_index = conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND name = 'uq_scan_results_dev_type'"
+        )).scalar()
+    assert unique_index == "uq_scan_results_dev_type"
+
+def test_migrate_target_ip_to_integer_rebuilds_target_ip_index(tmp_path, monkeypatch):
+    # 旧版数据库：target_ip为TEXT列且已建索引，直接DROP COLUMN会失败
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE scan_results (
+                id INTEGER PRIMARY KEY, device_id INTEGER, scan_type VARCHAR,
+                target_ip VARCHAR NOT NULL, scan_time DATETIME
+            )
+        """))
+        conn.execute(text("CREATE INDEX ix_scan_results_target_ip ON scan_results (target_ip)"))
+        conn.execute(text("CREATE INDEX ix_scan_results_dev_type_time ON scan_results (device_id, scan_type, scan_time)"))
+        conn.execute(text("INSERT INTO scan_results (device_id, scan_type, target_ip) VALUES (1, 'port_scan', '10.10.0.1')"))
+    monkeypatch.setattr(cleanup, "get_engine", lambda: engine)
+
+    assert cleanup.migrate_target_ip_to_integer() is True
+    assert cleanup.migrate_target_ip_to_integer() is False
+
+    with engine.connect() as conn:
+        columns = {row[1]: row[2] for row in conn.execute(text("PRAGMA table_info(scan_results)"))}
+        index_columns = [row[2] for row in conn.execute(text('PRAGMA index_info("ix_scan_results_target_ip")'))]
+        target_ip = conn.execute(text("SELECT target_ip FROM scan_results")).scalar()
+    engine.dispose()
+    assert columns["target_ip"] == "INTEGER"
+    assert "target_ip_int" not in columns
+    assert index_columns == ["target_ip"]
+    assert target_ip == 168427521
+
+def test_migrate_target_ip_to_integer_without_table(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+    assert cleanup.migrate_target_ip_to_integer(engine) is False
+    with engine.connect() as conn:
+        tables = conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'")).fetchall()
+    engine.dispose()
+    assert tables == []
+
+def test_ensure_schema_migrates_text_target_ip(tmp_path, monkeypatch):
+    # 升级前的数据库：完整表结构，但target_ip仍是带索引的TEXT列，存的是点分十进制
+    engine = create_engine(f"sqlite:///{tmp_path / 'iotlab.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_scan_results_target_ip"))
+        conn.execute(text("ALTER TABLE scan_results ADD COLUMN target_ip_text VARCHAR"))
+        conn.execute(text("ALTER TABLE scan_results DROP COLUMN target_ip"))
+        conn.execute(text("ALTER TABLE scan_results RENAME COLUMN target_ip_text TO target_ip"))
+        conn.execute(text("CREATE INDEX ix_scan_results_target_ip ON scan_results (target_ip)"))
+        conn.execute(text("""
+            INSERT INTO scan_results (device_id, scan_type, target_ip, status)
+            VALUES (1, 'port_scan', '10.10.0.1', 'success')
+        """))
+    monkeypatch.setattr(base, "get_engine", lambda: engine)
+    monkeypatch.setattr(base, "SCHEMA_LOCK_PATH", str(tmp_path / ".schema.lock"))
+
+    base.ensure_schema()
+
+    with engine.connect() as conn:
+        columns = {row[1]: row[2] for row in conn.execute(text("PRAGMA table_info(scan_results)"))}
+    with sessionmaker(bind=engine)() as db:
+        found = db.query(ScanResult).filter(ScanResult.target_ip == "10.10.0.1").all()
+    engine.dispose()
+    assert columns["target_ip"] == "INTEGER"
+    assert [result.target_ip for result in found] == ["10.10.0.1"]
+
+@pytest.mark.parametrize("name", sorted(POSTGRESQL_STATEMENTS))
+def test_statements_compile_for_postgresql(name):
+    sql = str(POSTGRESQL_STATEMENTS[name].compile(dialect=postgresql.dialect()))
+    assert unaliased_derived_tables(sql) == []
+    assert not re.search(r"(?<!:):[A-Za-z_]", sql)
+
+def test_unaliased_derived_tables_detects_missing_alias():
+    assert unaliased_derived_tables("SELECT MAX(id) FROM (SELECT id FROM t)") == ["FROM (SELECT id FROM t)"]
+    assert unaliased_derived_tables("SELECT * FROM (SELECT id FROM t) WHERE id > 1") == ["FROM (SELECT id FROM t)"]
+    assert unaliased_derived_tables("SELECT * FROM (SELECT id FROM t) AS ids WHERE id > 1") == []
+
+def test_migrate_target_ip_to_integer_skips_other_dialects(monkeypatch):
+    # PRAGMA/create_function只在SQLite上可用，其他数据库的target_ip由create_all直接建成整数列
+    class PostgresConnection:
+        dialect = postgresql.dialect()
+
+        def execute(self, *args, **kwargs):
+            pytest.fail("the migration must not run SQL on PostgreSQL")
+
+    class PostgresEngine:
+        @contextmanager
+        def begin(self):
+            yield PostgresConnection()
+
+    monkeypatch.setattr(cleanup, "get_engine", PostgresEngine)
+    assert cleanup.migrate_target_ip_to_integer() is False
@@ -0,0 +1,290 @@
+# ================== Configuration ==================
+import asyncio
+
+import pytest
+
+from api import devices
+from core.scan_engine import ScanResult as EngineScanResult, ScanType
+from db.models import Device, ScanResult
+
+SSH_PORT = {"port": 22, "protocol": "tcp", "state": "open", "service": "ssh"}
+DNS_PORT = {"port": 53, "protocol": "udp", "state": "open", "service": "domain"}
+
+# ================== Device List Filters ==================
+@pytest.fixture
+def listed_devices(db_session):
+    db_session.add_all([
+        Device(ip_address="10.12.0.1", mac_address="aa:00:00:00:00:01", hostname="camera", status="online"),
+        Device(ip_address="10.12.0.2", mac_address="aa:00:00:00:00:02", hostname="Unknown", status="online"),
+        Device(ip_address="10.12.0.3", mac_address="aa:00:00:00:00:03", hostname="Unknown Device", status="online"),
+        Device(ip_address=None, mac_address="aa:00:00:00:00:04", hostname="plug", status="offline"),
+    ])
+    db_session.commit()
+
+def listed_hostnames(client, **params):
+    resp = client.get("/devices/", params=params)
+    assert resp.status_code == 200
+    return sorted(device["hostname"] for device in resp.json())
+
+def test_get_devices_without_filters(client, listed_devices):
+    assert listed_hostnames(client) == ["Unknown", "Unknown Device", "camera", "plug"]
+
+def test_get_devices_filters_by_status(client, listed_devices):
+    assert listed_hostnames(client, status="online") == ["Unknown", "Unknown Device", "camera"]
+    resp = client.get("/devices/", params={"status": "offline"})
+    assert resp.json() == [{
+        "mac_address": "aa:00:00:00:00:04",
+        "hostname": "plug",
+        "ip_address": "",
+        "status": "offline",
+    }]
+
+def test_get_devices_excludes_hostnames(client, listed_devices):
+    assert listed_hostnames(client, exclude_hostname="Unknown, Unknown Device,") == ["camera", "plug"]
+    assert listed_hostnames(client, status="online", exclude_hostname="Unknown,Unknown Device") == ["camera"]
+
+# ================== Subnet Scan Targets ==================
+@pytest.fixture
+def discovery_targets(monkeypatch):
+    """Stub the ARP cache and nmap discovery; returns the targets each discover() call received."""
+    calls = []
+
+    def fake_discover(self, subnet, targets=None):
+        calls.append(targets)
+        return []
+
+    monkeypatch.setattr(devices.DeviceDiscovery, "read_arp_cache", staticmethod(lambda subnet: ["10.12.0.7"]))
+    monkeypatch.setattr(devices.DeviceDiscovery, "discover", fake_discover)
+    return calls
+
+def test_scan_known_only_probes_arp_and_online_devices_in_subnet(client, discovery_targets, db_session):
+    db_session.add_all([
+        Device(ip_address="10.12.0.3", mac_address="bb:00:00:00:00:03", hostname="camera", status="online"),
+        Device(ip_address="10.12.0.4", mac_address="bb:00:00:00:00:04", hostname="plug", status="offline"),
+        Device(ip_address="192.168.1.5", mac_address="bb:00:00:00:00:05", hostname="router", status="online"),
+    ])
+    db_session.commit()
+
+    resp = client.post("/devices/scan", json={"subnet": "10.12.0.0/24", "known_only": True})
+    assert resp.status_code == 200
+    assert discovery_targets == [["10.12.0.3", "10.12.0.7"]]
+
+def test_scan_known_only_falls_back_to_subnet_sweep(client, discovery_targets, monkeypatch):
+    monkeypatch.setattr(devices.DeviceDiscovery, "read_arp_cache", staticmethod(lambda subnet: []))
+    resp = client.post("/devices/scan", json={"subnet": "10.12.0.0/24", "known_only": True})
+    assert resp.status_code == 200
+    assert discovery_targets == [None]
+
+def test_scan_sweeps_subnet_by_default(client, discovery_targets, db_session):
+    db_session.add(Device(ip_address="10.12.0.3", mac_address="bb:00:00:00:00:03", hostname="camera", status="online"))
+    db_session.commit()
+
+    resp = client.post("/devices/scan", json={"subnet": "10.12.0.0/24"})
+    assert resp.status_code == 200
+    assert discovery_targets == [None]
+
+# ================== Batch Port Scan ==================
+@pytest.fixture
+def scanned_devices(monkeypatch):
+    """Stub ScanEngine.scan_multiple_devices; returns the device lists it was called with.
+
+    IPs ending in .99 come back with an error, every other IP with one TCP and one UDP port.
+    """
+    calls = []
+
+    async def fake_scan_multiple_devices(self, device_list, scan_type, max_failure_ratio=None):
+        calls.append(device_list)
+        results = []
+        for device in device_list:
+            failed = device["IP"].endswith(".99")
+            results.append({
+                "tcp_ports": [] if failed else [SSH_PORT],
+                "udp_ports": [] if failed else [DNS_PORT],
+                "scan_duration": 1.5,
+                "total_tcp_ports": 0 if failed else 1,
+                "total_udp_ports": 0 if failed else 1,
+                "error": "Host seems down" if failed else None,
+                "raw_output": "" if failed else f"nmap output for {device['IP']}",
+                "command": f"nmap {device['IP']}",
+            })
+        return {"results": results}
+
+    monkeypatch.setattr(devices.ScanEngine, "scan_multiple_devices", fake_scan_multiple_devices)
+    return calls
+
+def batch_portscan(client, ips, save_to_db=True, **options):
+    return client.post("/devices/batch_portscan", json={"ips": ips, "save_to_db": save_to_db, **options})
+
+def saved_scan_ips(db_session):
+    db_session.expire_all()
+    return sorted(result.target_ip for result in db_session.query(ScanResult).all())
+
+def test_batch_portscan_deduplicates_ips_in_request_order(client, scanned_devices):
+    resp = batch_portscan(client, ["10.12.0.2", "10.12.0.1", "10.12.0.2"])
+    assert resp.status_code == 200
+    assert [result["ip"] for result in resp.json()] == ["10.12.0.2", "10.12.0.1"]
+    assert [[device["IP"] for device in call] for call in scanned_devices] == [["10.12.0.2", "10.12.0.1"]]
+    first = resp.json()[0]
+    assert first["ports"] == [SSH_PORT, DNS_PORT]
+    assert first["total_tcp_ports"] == 1
+    assert first["total_udp_ports"] == 1
+    assert first["error"] is None
+
+def test_batch_portscan_rejects_invalid_ip(client, scanned_devices, db_session):
+    resp = batch_portscan(client, ["10.12.0.1", "10.12.0.300"])
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "Invalid IP address format"
+    assert scanned_devices == []
+    assert db_session.query(Device).count() == 0
+
+def test_batch_portscan_empty_list(client, scanned_devices):
+    resp = batch_portscan(client, [])
+    assert resp.status_code == 200
+    assert resp.json() == []
+    assert scanned_devices == []
+
+def test_batch_portscan_creates_missing_devices_and_saves_results(client, scanned_devices, db_session):
+    known = Device(ip_address="10.12.0.1", mac_address="aa:bb:cc:dd:ee:01", hostname="camera", status="online")
+    db_session.add(known)
+    db_session.commit()
+
+    resp = batch_portscan(client, ["10.12.0.1", "10.12.0.2", "10.12.0.3"])
+    assert resp.status_code == 200
+
+    db_session.expire_all()
+    by_ip = {device.ip_address: device for device in db_session.query(Device).all()}
+    assert sorted(by_ip) == ["10.12.0.1", "10.12.0.2", "10.12.0.3"]
+    assert by_ip["10.12.0.1"].hostname == "camera"
+    assert by_ip["10.12.0.2"].mac_address == "temp_10_12_0_2"
+    assert by_ip["10.12.0.2"].hostname == "External Device 10.12.0.2"
+    assert by_ip["10.12.0.3"].status == "online"
+
+    # 批量插入后重新查询得到的device_id用于保存扫描结果
+    results = {result.target_ip: result for result in db_session.query(ScanResult).all()}
+    assert sorted(results) == ["10.12.0.1", "10.12.0.2", "10.12.0.3"]
+    for ip, result in results.items():
+        assert result.device_id == by_ip[ip].id
+        assert result.scan_type == "port_scan"
+        assert result.ports == [SSH_PORT, DNS_PORT]
+        assert result.raw_output == f"nmap output for {ip}"
+
+def test_batch_portscan_recovers_temp_device_by_mac(client, scanned_devices, db_session):
+    # 子网扫描把离线的临时设备IP清空后，再次扫描该IP应复用原记录而不是新建
+    db_session.add(Device(ip_address=None, mac_address="temp_10_12_0_5", hostname="External Device 10.12.0.5", status="offline"))
+    db_session.commit()
+
+    resp = batch_portscan(client, ["10.12.0.5"])
+    assert resp.status_code == 200
+
+    db_session.expire_all()
+    all_devices = db_session.query(Device).all()
+    assert len(all_devices) == 1
+    assert all_devices[0].ip_address == "10.12.0.5"
+    assert all_devices[0].status == "online"
+    assert db_session.query(ScanResult).one().device_id == all_devices[0].id
+
+def test_batch_portscan_saves_only_successful_results(client, scanned_devices, db_session):
+    resp = batch_portscan(client, ["10.12.0.1", "10.12.0.99"])
+    assert resp.status_code == 200
+    errors = {result["ip"]: result["error"] for result in resp.json()}
+    assert errors == {"10.12.0.1": None, "10.12.0.99": "Host seems down"}
+    assert saved_scan_ips(db_session) == ["10.12.0.1"]
+
+def test_batch_portscan_without_save_to_db(client, scanned_devices, db_session):
+    resp = batch_portscan(client, ["10.12.0.1"], save_to_db=False)
+    assert resp.status_code == 200
+    assert len(resp.json()) == 1
+    assert saved_scan_ips(db_session) == []
+
+# ================== Batch Failure Threshold ==================
+@pytest.fixture
+def scanned_ips(monkeypatch):
+    """Stub ScanEngine.scan_single_device and the summary file; returns the IPs actually scanned.
+
+    IPs in 10.12.0.90-99 fail. The stub never suspends, so the batch scans the
+    devices one after another in request order.
+    """
+    scanned = []
+
+    async def fake_scan_single_device(self, target_ip, device_name="Unknown", scan_type=ScanType.PORT_SCAN):
+        scanned.append(target_ip)
+        result = EngineScanResult(target_ip, device_name, scan_type)
+        if target_ip.startswith("10.12.0.9"):
+            result.error = "Host seems down"
+        else:
+            result.tcp_ports = [SSH_PORT]
+        return result
+
+    monkeypatch.setattr(devices.ScanEngine, "scan_single_device", fake_scan_single_device)
+    monkeypatch.setattr(devices.ScanEngine, "_save_scan_summary", lambda self, summary: None)
+    return scanned
+
+def test_batch_portscan_skips_devices_after_failure_threshold(client, scanned_ips, db_session):
+    ips = ["10.12.0.91", "10.12.0.92", "10.12.0.1", "10.12.0.2"]
+    resp = batch_portscan(client, ips, max_failure_ratio=0.25)
+    assert resp.status_code == 200
+
+    # 4台设备的25%即1台：第二台失败后超过阈值，之后的设备不再扫描
+    assert scanned_ips == ["10.12.0.91", "10.12.0.92"]
+    errors = {result["ip"]: result["error"] for result in resp.json()}
+    assert errors == {
+        "10.12.0.91": "Host seems down",
+        "10.12.0.92": "Host seems down",
+        "10.12.0.1": "Skipped: batch failure threshold exceeded",
+        "10.12.0.2": "Skipped: batch failure threshold exceeded",
+    }
+    assert saved_scan_ips(db_session) == []
+
+def test_batch_portscan_scans_every_device_without_threshold(client, scanned_ips, db_session):
+    ips = ["10.12.0.91", "10.12.0.92", "10.12.0.1", "10.12.0.2"]
+    resp = batch_portscan(client, ips)
+    assert resp.status_code == 200
+    assert scanned_ips == ips
+    assert saved_scan_ips(db_session) == ["10.12.0.1", "10.12.0.2"]
+
+def test_batch_portscan_rejects_out_of_range_failure_ratio(client, scanned_ips):
+    resp = batch_portscan(client, ["10.12.0.1"], max_failure_ratio=1.5)
+    assert resp.status_code == 422
+    assert scanned_ips == []
+
+# ================== Single Device Scans ==================
+@pytest.fixture
+def device_lookups(monkeypatch):
+    """Wrap the device lookup-or-create; records whether each call ran off the event loop."""
+    off_loop = []
+    get_or_create_device_id = devices._get_or_create_device_id
+
+    def recording_get_or_create_device_id(db, ip):
+        try:
+            asyncio.get_running_loop()
+            off_loop.append(False)
+        except RuntimeError:
+            off_loop.append(True)
+        return get_or_create_device_id(db, ip)
+
+    monkeypatch.setattr(devices, "_get_or_create_device_id", recording_get_or_create_device_id)
+    return off_loop
+
+def test_port_scan_creates_temp_device_off_the_event_loop(client, scanned_ips, device_lookups, db_session):
+    resp = client.get("/devices/10.12.0.1/portscan")
+    assert resp.status_code == 200
+    assert resp.json()["ports"] == [SSH_PORT]
+    assert device_lookups == [True]
+
+    db_session.expire_all()
+    device = db_session.query(Device).one()
+    assert device.mac_address == "temp_10_12_0_1"
+    assert db_session.query(ScanResult).one().device_id == device.id
+
+def test_os_scan_reuses_known_device_off_the_event_loop(client, scanned_ips, device_lookups, db_session):
+    db_session.add(Device(ip_address="10.12.0.1", mac_address="aa:bb:cc:dd:ee:01", hostname="camera", status="online"))
+    db_session.commit()
+
+    resp = client.get("/devices/10.12.0.1/oscan")
+    assert resp.status_code == 200
+    assert device_lookups == [True]
+
+    db_session.expire_all()
+    device = db_session.query(Device).one()
+    assert device.hostname == "camera"
+    assert db_session.query(ScanResult).one().scan_type == "os_scan"
@@ -0,0 +1,129 @@
+# ================== Configuration ==================
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import OperationalError
+
+from api.scan_results import build_scan_result_upsert, update_or_create_scan_result
+from api.schemas import ScanResultCreate
+from db.models import Device, ScanResult
+
+TARGET_IP = "10.12.0.100"
+
+# ================== Helper Functions ==================
+@pytest.fixture
+def device(db_session):
+    device = Device(ip_address=TARGET_IP, mac_address="00:11:22:33:44:55", hostname="test-device", status="online")
+    db_session.add(device)
+    db_session.commit()
+    return device
+
+def port_scan(device, duration, ports):
+    return ScanResultCreate(
+        device_id=device.id,
+        scan_type="port_scan",
+        target_ip=TARGET_IP,
+        scan_duration=duration,
+        ports=ports,
+        raw_output=f"raw {duration}",
+    )
+
+def saved_rows(db_session):
+    db_session.expire_all()
+    return db_session.query(ScanResult).all()
+
+# ================== Test Cases ==================
+def test_update_or_create_upserts_on_unique_index(db_session, device):
+    first = update_or_create_scan_result(port_scan(device, 10, [{"port": 22}]), db_session)
+    second = update_or_create_scan_result(port_scan(device, 20, [{"port": 80}]), db_session)
+
+    rows = saved_rows(db_session)
+    assert len(rows) == 1
+    assert second.id == first.id
+    assert rows[0].scan_duration == 20
+    assert rows[0].ports == [{"port": 80}]
+    assert rows[0].target_ip == TARGET_IP
+
+def test_update_or_create_falls_back_without_unique_index(db_session, device):
+    # 旧数据库：尚未建立 (device_id, scan_type) 唯一索引，ON CONFLICT 无法使用
+    db_session.execute(text("DROP INDEX uq_scan_results_dev_type"))
+    db_session.commit()
+
+    first = update_or_create_scan_result(port_scan(device, 10, [{"port": 22}]), db_session)
+    second = update_or_create_scan_result(port_scan(device, 20, [{"port": 80}]), db_session)
+
+    rows = saved_rows(db_session)
+    assert len(rows) == 1
+    assert second.id == first.id
+    assert rows[0].scan_duration == 20
+    assert rows[0].ports == [{"port": 80}]
+
+def test_update_or_create_reraises_other_operational_errors(db_session, device):
+    db_session.execute(text("DROP TABLE scan_results"))
+    db_session.commit()
+
+    with pytest.raises(OperationalError, match="no such table"):
+        update_or_create_scan_result(port_scan(device, 10, []), db_session)
+
+def test_scan_result_upsert_compiles_for_postgresql():
+    stmt = build_scan_result_upsert({"device_id": 1, "scan_type": "port_scan", "status": "success"}, "postgresql")
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (device_id, scan_type) DO UPDATE SET status = excluded.status" in sql
+
+def test_scan_result_upsert_not_built_for_other_dialects():
+    assert build_scan_result_upsert({"device_id": 1, "scan_type": "port_scan"}, "mysql") is None
+
+# ================== Raw Output ==================
+@pytest.fixture
+def saved_port_scan(db_session, device):
+    return update_or_create_scan_result(port_scan(device, 10, [{"port": 22}]), db_session)
+
+def test_get_scan_results_includes_raw_output_by_default(client, saved_port_scan):
+    resp = client.get("/scan-results/")
+    assert resp.status_code == 200
+    assert [result["raw_output"] for result in resp.json()] == ["raw 10"]
+
+def test_get_scan_results_without_raw_output(client, saved_port_scan):
+    resp = client.get("/scan-results/", params={"include_raw": "false"})
+    assert resp.status_code == 200
+    results = resp.json()
+    assert [result["raw_output"] for result in results] == [None]
+    assert results[0]["ports"] == [{"port": 22}]
+    assert results[0]["target_ip"] == TARGET_IP
+
+def test_get_latest_scan_result_include_raw(client, saved_port_scan, device):
+    url = f"/scan-results/device/{device.id}/latest"
+    with_raw = client.get(url, params={"scan_type": "port_scan"})
+    without_raw = client.get(url, params={"scan_type": "port_scan", "include_raw": "false"})
+    assert with_raw.status_code == without_raw.status_code == 200
+    assert with_raw.json()["raw_output"] == "raw 10"
+    assert without_raw.json()["raw_output"] is None
+    assert without_raw.json()["id"] == with_raw.json()["id"]
+
+# ================== Ordering ==================
+@pytest.fixture
+def same_second_scans(db_session, device):
+    # 同一秒内写入的两条结果：scan_time相同时按id倒序，分页结果才稳定
+    scan_time = datetime(2025, 1, 1, 12, 0, 0)
+    db_session.add_all([
+        ScanResult(device_id=device.id, scan_type="port_scan", target_ip=TARGET_IP, scan_time=scan_time),
+        ScanResult(device_id=device.id, scan_type="os_scan", target_ip=TARGET_IP, scan_time=scan_time),
+    ])
+    db_session.commit()
+    return [row.id for row in saved_rows(db_session)]
+
+def test_get_scan_results_breaks_scan_time_ties_by_id(client, same_second_scans):
+    resp = client.get("/scan-results/")
+    assert resp.status_code == 200
+    assert [result["id"] for result in resp.json()] == sorted(same_second_scans, reverse=True)
+
+    first_page = client.get("/scan-results/", params={"limit": 1})
+    second_page = client.get("/scan-results/", params={"limit": 1, "offset": 1})
+    assert [first_page.json()[0]["id"], second_page.json()[0]["id"]] == sorted(same_second_scans, reverse=True)
+
+def test_get_device_scan_results_breaks_scan_time_ties_by_id(client, same_second_scans, device):
+    resp = client.get(f"/scan-results/device/{device.id}")
+    assert resp.status_code == 200
+    assert [result["id"] for result in resp.json()] == sorted(same_second_scans, reverse=True)
@@ -1,22 +1,19 @@
 import os
+import json
 import time
 import logging
 import sys
 from datetime import datetime
 from celery import Celery
-from db.base import SessionLocal
-from db.models import Experiment
+from db.base import get_sessionmaker
+from db.models import Experiment, Capture, ScriptExecution
 from core.attack_engine import AttackEngine
 from core.attack_engine_v2 import CyclicAttackEngine, AttackConfig, AttackType, AttackMode
 import asyncio
 from core.traffic_capture import TcpdumpUtil
-from db.models import Capture
 from typing import Dict, Any
-from db.models import ScriptExecution
 import tempfile
 import subprocess
-import os
-from datetime import datetime
 
 """
 Celery worker module for IoT Lab Experiment Scheduler.
@@ -29,19 +26,20 @@ Celery is configured to use Redis as broker and result backend, with UK timezone
 """
 
 # Configure logging with UK timezone
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S',
-    filename='logs/app.log',
-    filemode='a'
-)
-# Also log to stdout
-console = logging.StreamHandler(sys.stdout)
-console.setLevel(logging.INFO)
-formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s')
-console.setFormatter(formatter)
-logging.getLogger('').addHandler(console)
+if not logging.getLogger('').handlers:
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S',
+        filename='logs/app.log',
+        filemode='a'
+    )
+    # Also log to stdout
+    console = logging.StreamHandler(sys.stdout)
+    console.setLevel(logging.INFO)
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    console.setFormatter(formatter)
+    logging.getLogger('').addHandler(console)
 
 celery = Celery(__name__)
 celery.conf.update(
@@ -51,6 +49,17 @@ celery.conf.update(
     enable_utc=False
 )
 
+def pcap_file_size(path):
+    """
+    Return the size of a PCAP file in bytes, or None if it does not exist.
+
+    One stat() call instead of os.path.exists() followed by os.path.getsize().
+    """
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return None
+
 @celery.task(name="create_task")
 def create_task(task_type):
     """
@@ -82,7 +91,7 @@ def stop_attack_experiment(experiment_id):
         bool: True if experiment stopped successfully, False otherwise.
     """
     logger = logging.getLogger(__name__)
-    db = SessionLocal()
+    db = get_sessionmaker()()
     try:
         # Fetch the experiment record from the database by ID
         exp = db.query(Experiment).get(experiment_id)
@@ -135,7 +144,7 @@ def run_attack_experiment(experiment_id, attack_type, target_ip, port, duration,
         bool: True if experiment completed successfully, False otherwise.
     """
     logger = logging.getLogger(__name__)
-    db = SessionLocal()
+    db = get_sessionmaker()()
     try:
         # Step 1: Fetch the experiment record from the database by ID
         exp = db.query(Experiment).get(experiment_id)
@@ -176,7 +185,7 @@ def run_attack_experiment(experiment_id, attack_type, target_ip, port, duration,
         tcpdump.stop()
 
         # Step 5.6: Save PCAP file information to the captures table
-        file_size = os.path.getsize(pcap_path) if os.path.exists(pcap_path) else 0
+        file_size = pcap_file_size(pcap_path) or 0
         capture = Capture(
             file_name=pcap_filename,
             file_path=pcap_path,
@@ -217,7 +226,7 @@ def run_traffic_capture(experiment_id, target_ip, duration, interface="eth0"):
     Celery task to perform only traffic capture (no attack), save PCAP and update Experiment/Capture.
     """
     logger = logging.getLogger(__name__)
-    db = SessionLocal()
+    db = get_sessionmaker()()
     try:
         exp = db.query(Experiment).get(experiment_id)
         if not exp:
@@ -240,7 +249,7 @@ def run_traffic_capture(experiment_id, target_ip, duration, interface="eth0"):
         tcpdump.stop()
 
         # Save PCAP info
-        file_size = os.path.getsize(pcap_path) if os.path.exists(pcap_path) else 0
+        file_size = pcap_file_size(pcap_path) or 0
         capture = Capture(
             file_name=pcap_filename,
             file_path=pcap_path,
@@ -272,13 +281,8 @@ def run_traffic_capture(experiment_id, target_ip, duration, interface="eth0"):
 @celery.task(name="run_cyclic_attack_experiment")
 def run_cyclic_attack_experiment(experiment_id, attack_config_dict):
     """执行循环攻击实验的Celery任务"""
-    import json
-    import os
-    from datetime import datetime
-    from core.traffic_capture import TcpdumpUtil
-    
     logger = logging.getLogger(__name__)
-    db = SessionLocal()
+    db = get_sessionmaker()()
     
     try:
         # 1. 获取实验记录
@@ -330,8 +334,8 @@ def run_cyclic_attack_experiment(experiment_id, attack_config_dict):
             tcpdump.stop()
 
             # 保存PCAP文件信息
-            if os.path.exists(pcap_path):
-                file_size = os.path.getsize(pcap_path)
+            file_size = pcap_file_size(pcap_path)
+            if file_size is not None:
                 capture = Capture(
                     file_name=pcap_filename,
                     file_path=pcap_path,
@@ -383,7 +387,7 @@ def run_cyclic_attack_experiment(experiment_id, attack_config_dict):
 def execute_shell_script(execution_id: int, script_content: str, parameters: Dict[str, Any]):
     """执行shell脚本的Celery任务"""
     logger = logging.getLogger(__name__)
-    db = SessionLocal()
+    db = get_sessionmaker()()
     
     try:
         # 更新执行状态为running